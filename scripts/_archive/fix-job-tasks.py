@@ -2,6 +2,10 @@
 """
 Fix job_tasks: delete all, re-import with integer qc_weight,
 then patch decimal values individually.
+
+Superseded by `scripts/import-excel-data.py --only job_tasks`, which reads
+job and task ids from the database (load_id_maps) and loads decimal
+qc_weight values directly. Kept for reference; not maintained.
 """
 
 import openpyxl
@@ -0,0 +1,324 @@
+"""Workbook export for import-excel-data.py (--export)."""
+
+import openpyxl
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+import json
+import queue
+import threading
+import time
+import uuid
+import os
+
+# The import-excel-data.py module, set by it when it loads this one
+core = None
+
+# The reverse of import_data(): one sheet per imported table, with the headers
+# (including the misaligned Inventory Count ones) and value formats that
+# import_data() reads back. Statuses, frequencies and conditions are written
+# as their database codes, which import_data() maps to themselves.
+EXPORT_PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', '1000'))
+EXPORT_PREFETCH = int(os.environ.get('EXPORT_PREFETCH', '4'))
+NO_ARCHIVED_AT = {'lookups'}   # exported tables without soft delete
+
+# clean_role() input for each role it produces
+ROLE_LABELS = {
+    'OWNER_ADMIN': 'Owner', 'MANAGER': 'Manager', 'SUPERVISOR': 'Supervisor',
+    'CLEANER': 'Cleaner', 'INSPECTOR': 'Inspector', 'SALES': 'Sales',
+}
+
+export_refs = {}     # table → id → business code, filled as parent sheets are written
+supply_labels = {}   # supply id → "NAME [CODE]", as the count detail sheet has it
+supply_codes = {}    # upper-cased supply name → code
+
+def ref(table, fk):
+    return lambda r: export_refs.get(table, {}).get(r.get(fk))
+
+def addr(col, key):
+    return lambda r: (r.get(col) or {}).get(key)
+
+def staff_first_name(r):
+    # import_data() falls back to the staff code when both names are empty
+    if r.get('first_name') or r.get('last_name'):
+        return r.get('first_name')
+    return r.get('full_name')
+
+EXPORT_SHEETS = [
+    ('Lookups', 'lookups', [
+        ('Category', 'category'), ('Code', 'code'), ('Value', 'label'),
+        ('Sort', 'sort_order'), ('Active', 'is_active'),
+    ]),
+    ('Staff Position', 'staff_positions', [
+        ('Position Code', 'position_code'), ('Position Name', 'title'),
+        ('Skill Level', 'pay_grade'), ('Notes', 'notes'), ('Is Active', 'is_active'),
+    ]),
+    ('Service', 'services', [
+        ('Service Code', 'service_code'), ('Service Name', 'name'), ('Description', 'description'),
+    ]),
+    ('Task', 'tasks', [
+        ('Task Code', 'task_code'), ('Task Name', 'name'), ('Category', 'category'),
+        ('Subcategory', 'subcategory'), ('Area Type', 'area_type'), ('Floor Type', 'floor_type'),
+        ('Priority Level', 'priority_level'), ('Default Minutes', 'default_minutes'),
+        ('Production Rate', 'production_rate_sqft_per_hour'), ('Default UOM', 'unit_code'),
+        ('Spec Description', 'spec_description'), ('Work Description', 'work_description'),
+        ('Tools Materials', 'tools_materials'), ('Notes', 'notes'), ('Is Active', 'is_active'),
+    ]),
+    ('Service Task', 'service_tasks', [
+        ('Service Code', ref('services', 'service_id')), ('Task Code', ref('tasks', 'task_id')),
+        ('Typical Frequency', 'frequency_default'), ('Sequence Order', 'sequence_order'),
+        ('Priority Level', 'priority_level'), ('Is Required', 'is_required'),
+        ('Estimated Minutes', 'estimated_minutes'), ('Quality Weight', 'quality_weight'),
+        ('Notes', 'notes'),
+    ]),
+    ('Client', 'clients', [
+        ('Client Code', 'client_code'), ('Client Name', 'name'), ('Client Status', 'status'),
+        ('Billing Address', addr('billing_address', 'street')),
+        ('Suite/Unit', addr('billing_address', 'suite')),
+        ('Billing City', addr('billing_address', 'city')),
+        ('Billing State', addr('billing_address', 'state')),
+        ('Billing Zip', addr('billing_address', 'zip')),
+        ('Client Since', 'client_since'), ('Client Type', 'client_type'), ('Industry', 'industry'),
+        ('Bill To Name', 'bill_to_name'), ('Payment Terms', 'payment_terms'),
+        ('PO Required', 'po_required'), ('Insurance Required', 'insurance_required'),
+        ('Insurance Expiry Date', 'insurance_expiry'), ('Credit Limit', 'credit_limit'),
+        ('Website', 'website'), ('Tax ID', 'tax_id'),
+        ('Contract Start Date', 'contract_start_date'), ('Contract End Date', 'contract_end_date'),
+        ('Auto Renewal', 'auto_renewal'), ('Invoice Frequency', 'invoice_frequency'),
+        ('Notes', 'notes'),
+    ]),
+    ('Staff', 'staff', [
+        ('Staff Code', 'staff_code'), ('First Name', staff_first_name), ('Last Name', 'last_name'),
+        ('Preferred Name', 'preferred_name'),
+        ('Staff Role', lambda r: ROLE_LABELS.get(r.get('role'), 'Cleaner')),
+        ('Staff Status', 'staff_status'), ('Staff Type', 'staff_type'),
+        ('Employment Type', 'employment_type'), ('Hire Date', 'hire_date'),
+        ('Termination Date', 'termination_date'), ('Email', 'email'),
+        ('Mobile Phone', lambda r: r.get('mobile_phone') or r.get('phone')),
+        ('Pay Rate', 'pay_rate'), ('Schedule Type', 'schedule_type'),
+        ('Street Address', addr('address', 'street')), ('Suite/Unit', addr('address', 'suite')),
+        ('City', addr('address', 'city')), ('State', addr('address', 'state')),
+        ('ZIP Code', addr('address', 'zip')),
+        ('Emergency Contact Name', 'emergency_contact_name'),
+        ('Emergency Contact Phone', 'emergency_contact_phone'),
+        ('Emergency Contact Relationship', 'emergency_contact_relationship'),
+        ('Certifications', 'certifications'), ('Performance Rating', 'performance_rating'),
+        ('Background Check Date', 'background_check_date'), ('Photo URL', 'photo_url'),
+        ('Supervisor Code', ref('staff', 'supervisor_id')), ('Notes', 'notes'),
+    ]),
+    ('Site', 'sites', [
+        ('Site Code', 'site_code'), ('Site Name', 'name'), ('Client Code', ref('clients', 'client_id')),
+        ('Site Status', 'status'), ('Status Date', 'status_date'), ('Status Reason', 'status_reason'),
+        ('Service Start Date', 'service_start_date'),
+        ('Street Address', addr('address', 'street')), ('Suite/Unit', addr('address', 'suite')),
+        ('City', addr('address', 'city')), ('State', addr('address', 'state')),
+        ('ZIP Code', addr('address', 'zip')),
+        ('Alarm Code', 'alarm_code'), ('Alarm System', 'alarm_system'),
+        ('Alarm Company', 'alarm_company'), ('Security Protocol', 'security_protocol'),
+        ('Entry Instructions', lambda r: r.get('entry_instructions') or r.get('access_notes')),
+        ('Parking Instructions', 'parking_instructions'),
+        ('Total Cleanable SqFt', 'square_footage'), ('Number Of Floors', 'number_of_floors'),
+        ('Employees On Site', 'employees_on_site'),
+        ('Earliest Start Time', 'earliest_start_time'), ('Latest Start Time', 'latest_start_time'),
+        ('Business Hours Start', 'business_hours_start'), ('Business Hours End', 'business_hours_end'),
+        ('Weekend Access', 'weekend_access'),
+        ('Janitorial Closet Location', 'janitorial_closet_location'),
+        ('Supply Storage Location', 'supply_storage_location'),
+        ('Water Source Location', 'water_source_location'), ('Dumpster Location', 'dumpster_location'),
+        ('Supervisor Code', ref('staff', 'supervisor_id')),
+        ('Risk Level', 'risk_level'), ('Priority Level', 'priority_level'),
+        ('OSHA Compliance Required', 'osha_compliance_required'),
+        ('Background Check Required', 'background_check_required'),
+        ('Last Inspection Date', 'last_inspection_date'),
+        ('Next Inspection Date', 'next_inspection_date'), ('Notes', 'notes'),
+    ]),
+    ('Subcontractor', 'subcontractors', [
+        ('Subcontractor Code', 'subcontractor_code'), ('Subcontractor Name', 'company_name'),
+        ('Contact Name', 'contact_name'), ('Contact Title', 'contact_title'), ('Email', 'email'),
+        ('Business Phone', lambda r: r.get('business_phone') or r.get('phone')),
+        ('Mobile Phone', 'mobile_phone'), ('Website', 'website'),
+        ('Street Address', addr('address', 'street')), ('City', addr('address', 'city')),
+        ('State', addr('address', 'state')), ('ZIP Code', addr('address', 'zip')),
+        ('Services Provided', 'services_provided'), ('License Number', 'license_number'),
+        ('License Expiry', 'license_expiry'), ('Insurance Company', 'insurance_company'),
+        ('Insurance Policy Number', 'insurance_policy_number'),
+        ('Insurance Expiry', 'insurance_expiry'), ('Hourly Rate', 'hourly_rate'),
+        ('Payment Terms', 'payment_terms'), ('Tax ID', 'tax_id'), ('W9 On File', 'w9_on_file'),
+        ('Notes', 'notes'),
+    ]),
+    ('Site Job', 'site_jobs', [
+        ('Job Code', 'job_code'), ('Job Name', 'job_name'), ('Site Code', ref('sites', 'site_id')),
+        ('Service Code', ref('services', 'service_id')), ('Job Status', 'status'),
+        ('Frequency', 'frequency'), ('Subcontractor Code', ref('subcontractors', 'subcontractor_id')),
+        ('Job Type', 'job_type'), ('Priority Level', 'priority_level'),
+        ('Schedule Days', 'schedule_days'), ('Staff Needed', 'staff_needed'),
+        ('Start Time', 'start_time'), ('End Time', 'end_time'),
+        ('Estimated Hours Svc', 'estimated_hours_per_service'),
+        ('Estimated Hours Mo', 'estimated_hours_per_month'),
+        ('Last Service Date', 'last_service_date'), ('Next Service Date', 'next_service_date'),
+        ('Quality Score', 'quality_score'), ('Billing UOM', 'billing_uom'),
+        ('Billing Amount', 'billing_amount'), ('Job Assigned To', 'job_assigned_to'),
+        ('Invoice Service Description', 'invoice_description'),
+        ('Job Specifications', 'specifications'), ('Special Requirements', 'special_requirements'),
+        ('Notes', 'notes'),
+    ]),
+    ('Job Task', 'job_tasks', [
+        ('Job Code', ref('site_jobs', 'job_id')),
+        ('Task Code', lambda r: export_refs['tasks'].get(r.get('task_id')) or r.get('task_code')),
+        ('Task Name', 'task_name'), ('Planned Minutes', 'planned_minutes'),
+        ('Qc Weight', 'qc_weight'), ('Is Required', 'is_required'), ('Status', 'status'),
+        ('Notes', 'notes'),
+    ]),
+    ('Supply', 'supply_catalog', [
+        ('\U0001f3f7\ufe0f Supply_Code', 'code'), ('\U0001f1fa\U0001f1f8 Supply_Name_EN', 'name'),
+        ('\U0001f4dd Description_EN', 'description'), ('\U0001f4c1 Supply_Category', 'category'),
+        ('\U0001f504 Supply_Status', 'supply_status'), ('Unit_Of_Measure', 'unit'),
+        ('Pack_Size', 'pack_size'), ('\u26a0\ufe0f Min_Stock_Level', 'min_stock_level'),
+        ('Brand', 'brand'), ('Manufacturer', 'manufacturer'), ('Model_Number', 'model_number'),
+        ('Markup_Percentage', 'markup_percentage'), ('Billing_Rate', 'billing_rate'),
+        ('Preferred_Vendor', 'preferred_vendor'), ('Vendor_Item_Sku', 'vendor_sku'),
+        ('Eco_Rating', 'eco_rating'), ('PPE', 'ppe_required'), ('SDS_Link', 'sds_url'),
+        ('\U0001f5bc\ufe0f Supply_Image_URL', 'image_url'), ('Notes', 'notes'),
+    ]),
+    ('Equipment', 'equipment', [
+        ('Equipment Code', 'equipment_code'), ('Equipment Name', 'name'),
+        ('Equipment Type', 'equipment_type'), ('Equipment Category', 'equipment_category'),
+        ('Manufacturer', 'manufacturer'), ('Brand', 'brand'), ('Model Number', 'model_number'),
+        ('Condition', 'condition'), ('Serial Number', 'serial_number'),
+        ('Purchase Date', 'purchase_date'), ('Purchase Price', 'purchase_price'),
+        ('Maintenance Specs', 'maintenance_specs'), ('Maintenance Schedule', 'maintenance_schedule'),
+        ('Last Maintenance Date', 'last_maintenance_date'),
+        ('Next Maintenance Date', 'next_maintenance_date'),
+        ('Equipment Photo URL', 'photo_url'), ('Notes', 'notes'),
+    ]),
+    ('Equipment Assignment', 'equipment_assignments', [
+        ('Equipment Code', ref('equipment', 'equipment_id')),
+        ('Assigned Employee Code', ref('staff', 'staff_id')),
+        ('Assigned Site Code', ref('sites', 'site_id')),
+        ('Assignment Date', 'assigned_date'), ('Return Date', 'returned_date'), ('Notes', 'notes'),
+    ]),
+    ('Supply Assignment', 'site_supplies', [
+        ('\U0001f3e2 Site_Code', ref('sites', 'site_id')),
+        ('\U0001f3f7\ufe0f Supply_Code', lambda r: supply_codes.get((r.get('name') or '').upper(), r.get('name'))),
+        ('\U0001f4e6 Supply_Name', 'name'), ('Notes', 'notes'),
+    ]),
+    # Same misaligned headers import_data() reads (see 2p and 2q there)
+    ('Inventory Count', 'inventory_counts', [
+        ('\U0001f4ca Count ID', 'count_code'), ('\U0001f516 Count Code', ref('sites', 'site_id')),
+        ('\U0001f4dd Form Code', 'count_date'), ('\u23f0 Count Timestamp', 'notes'),
+    ]),
+    ('Inventory Count Detail', 'inventory_count_details', [
+        ('\U0001f522 Detail ID', ref('inventory_counts', 'count_id')),
+        ('\U0001f3f7\ufe0f Supply Code', lambda r: supply_labels.get(r.get('supply_id'))),
+        ('\U0001f4e6 Supply Category', 'actual_qty'),
+    ]),
+]
+
+def export_cell(v):
+    if isinstance(v, uuid.UUID):
+        return str(v)
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, default=core.json_default)
+    if isinstance(v, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', v)
+    return v
+
+def rest_rows_page(table, after_id):
+    query = (f'{table}?select=*&tenant_id=eq.{core.TENANT_ID}&id=gt.{after_id}'
+             f'&order=id&limit={EXPORT_PAGE_SIZE}')
+    if table not in NO_ARCHIVED_AT:
+        query += '&archived_at=is.null'
+    page, _ = core.rest_get(query)
+    return page
+
+def pg_rows_page(table, after_id):
+    from psycopg import sql
+    from psycopg.rows import dict_row
+    query = sql.SQL('SELECT * FROM {} WHERE tenant_id = %s AND id > %s{} ORDER BY id LIMIT %s').format(
+        sql.Identifier(table),
+        sql.SQL('') if table in NO_ARCHIVED_AT else sql.SQL(' AND archived_at IS NULL'))
+    with core.pg_connect().cursor(row_factory=dict_row) as cur:
+        rows = cur.execute(query, [core.TENANT_ID, after_id, EXPORT_PAGE_SIZE]).fetchall()
+    return [{k: str(v) if isinstance(v, uuid.UUID) else v for k, v in r.items()} for r in rows]
+
+def fetch_pages(table, pages, stop):
+    """Producer: keyset-page TENANT_ID's live rows of table into the pages queue.
+
+    Ends with None (or the exception that stopped it). Gives up once stop is
+    set, so an abandoned export does not leave threads blocked on a full queue.
+    """
+    fetch = pg_rows_page if core.IMPORT_BACKEND == 'copy' else rest_rows_page
+    after_id = core.NIL_UUID
+    item = None
+    try:
+        while True:
+            page = fetch(table, after_id)
+            if page:
+                if not offer(pages, page, stop):
+                    return
+            if len(page) < EXPORT_PAGE_SIZE:
+                break
+            after_id = page[-1]['id']
+    except Exception as e:
+        item = e
+    offer(pages, item, stop)
+
+def offer(pages, item, stop):
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def export_workbook(path):
+    """Write TENANT_ID's live data to path as a workbook import_data() can read.
+
+    Every table is fetched at once, EXPORT_PREFETCH pages ahead of the writer,
+    and rows go straight into a write-only workbook, so memory stays flat
+    however large the tables are (apart from the id → code maps).
+    """
+    print(f'\n=== Exporting tenant {core.TENANT_ID} to {path} ===\n')
+    if core.IMPORT_BACKEND == 'copy':
+        core.pg_connect()
+    # Staff reference each other, so their codes are needed up front
+    export_refs['staff'] = {sid: code for code, sid in core.fetch_id_map('staff').items()}
+
+    stop = threading.Event()
+    feeds = []
+    for _, table, _ in EXPORT_SHEETS:
+        pages = queue.Queue(maxsize=EXPORT_PREFETCH)
+        core._upload_pool.submit(fetch_pages, table, pages, stop)
+        feeds.append(pages)
+
+    started = time.monotonic()
+    total = 0
+    wb = openpyxl.Workbook(write_only=True)
+    try:
+        for (sheet, table, columns), pages in zip(EXPORT_SHEETS, feeds):
+            ws = wb.create_sheet(sheet)
+            ws.append([header for header, _ in columns])
+            key_col = core.ID_MAP_KEYS.get(table)
+            refs = export_refs.setdefault(table, {}) if key_col else None
+            n = 0
+            while (page := pages.get()) is not None:
+                if isinstance(page, Exception):
+                    raise page
+                for r in page:
+                    if key_col:
+                        refs[r['id']] = r[key_col]
+                    if table == 'supply_catalog':
+                        supply_labels[r['id']] = f'{r["name"]} [{r["code"]}]'
+                        supply_codes.setdefault((r['name'] or '').upper(), r['code'])
+                    ws.append([export_cell(get(r) if callable(get) else r.get(get))
+                               for _, get in columns])
+                    n += 1
+            print(f'  {sheet}: {n} rows')
+            total += n
+        wb.save(path)
+    finally:
+        stop.set()
+    elapsed = time.monotonic() - started
+    print('\n=== EXPORT COMPLETE ===')
+    print(f'Rows:                 {total}')
+    print(f'Wall time:            {elapsed:.1f}s')
+    print(f'Workbook:             {path}')
@@ -0,0 +1,222 @@
+"""Workbook merge for import-excel-data.py (--merge)."""
+
+import openpyxl
+import hashlib
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, date
+
+# The import-excel-data.py module, set by it when it loads this one
+core = None
+
+# Regional copies of the workbook share codes, so the same client, site or
+# staff member can appear in several files with slightly different data.
+# merge_workbooks() streams every input twice with openpyxl's read-only
+# reader. The first pass keys each row by its sheet's business code
+# (MERGE_KEYS), hashes the key and keeps, per key, only the location of the
+# best row so far under MERGE_PRECEDENCE. The second pass writes the winning
+# rows (and rows without a key, which import_data skips or handles itself)
+# to one workbook, with the union of each sheet's columns, which is then
+# imported once. The index holds a few numbers per distinct key; past
+# MERGE_INDEX_MEMORY keys it moves to a temporary SQLite file, so memory
+# stays flat however large the inputs are.
+#
+# MERGE_PRECEDENCE is a comma-separated list of rules, tried in order until
+# one prefers a row (default complete,last):
+#   complete   more non-empty cells (what the Staff sheet's -B rows are)
+#   last       the file given later on the command line
+#   first      the file given earlier
+#   newest     the most recently modified file
+# Within the merged Staff sheet, -A/-B variants of one person are still
+# separate keys and resolved by import_data() as before.
+MERGE_PRECEDENCE = [r.strip() for r in os.environ.get('MERGE_PRECEDENCE', 'complete,last').split(',') if r.strip()]
+MERGE_INDEX_MEMORY = int(os.environ.get('MERGE_INDEX_MEMORY', '500000'))
+MERGE_OUTPUT = os.environ.get('MERGE_OUTPUT', '')
+
+# Columns identifying the same entity across files, per sheet
+MERGE_KEYS = {
+    'Lookups': ('Category', 'Code'),
+    'Staff Position': ('Position Code',),
+    'Service': ('Service Code',),
+    'Task': ('Task Code',),
+    'Service Task': ('Service Code', 'Task Code'),
+    'Client': ('Client Code',),
+    'Staff': ('Staff Code',),
+    'Site': ('Site Code',),
+    'Subcontractor': ('Subcontractor Code',),
+    'Site Job': ('Job Code',),
+    'Job Task': ('Job Code', 'Task Code'),
+    'Supply': ('\U0001f3f7\ufe0f Supply_Code',),
+    'Equipment': ('Equipment Code',),
+    'Equipment Assignment': ('Equipment Code', 'Assigned Employee Code', 'Assigned Site Code', 'Assignment Date'),
+    'Supply Assignment': ('\U0001f3e2 Site_Code', '\U0001f3f7\ufe0f Supply_Code'),
+    'Inventory Count': ('\U0001f4ca Count ID',),
+    'Inventory Count Detail': ('\U0001f522 Detail ID', '\U0001f3f7\ufe0f Supply Code'),
+}
+
+class MergeIndex:
+    """Best row location per hashed key; a dict that spills to SQLite when large."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.rows = {}   # key hash → [rank, content hash, file, sheet, row]
+        self.db = None
+
+    def offer(self, key, rank, digest, loc):
+        """Record the row at loc (file, sheet, row) for key if it outranks the current one.
+
+        Returns None for a new key, else whether the rows' contents differ.
+        """
+        if self.db is None:
+            cur = self.rows.get(key)
+            if cur is None:
+                self.rows[key] = [rank, digest, *loc]
+                if len(self.rows) > self.limit:
+                    self.spill()
+                return None
+            if rank > cur[0]:
+                self.rows[key] = [rank, digest, *loc]
+            return cur[1] != digest
+        cur = self.db.execute('SELECT rank, digest FROM idx WHERE k = ?', (key,)).fetchone()
+        if cur is None:
+            self.db.execute('INSERT INTO idx VALUES (?, ?, ?, ?, ?, ?)', (key, rank, digest, *loc))
+            return None
+        if rank > cur[0]:
+            self.db.execute('UPDATE idx SET rank = ?, digest = ?, f = ?, sheet = ?, r = ? WHERE k = ?',
+                            (rank, digest, *loc, key))
+        return cur[1] != digest
+
+    def spill(self):
+        self.path = tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False).name
+        self.db = sqlite3.connect(self.path)
+        self.db.execute('PRAGMA journal_mode = OFF')
+        self.db.execute('PRAGMA synchronous = OFF')
+        self.db.execute('CREATE TABLE idx (k INTEGER PRIMARY KEY, rank TEXT, digest INTEGER, '
+                        'f INTEGER, sheet TEXT, r INTEGER)')
+        self.db.executemany('INSERT INTO idx VALUES (?, ?, ?, ?, ?, ?)',
+                            ((k, *v) for k, v in self.rows.items()))
+        self.rows = {}
+        print(f'  Merge index past {self.limit} keys, continuing on disk ({self.path})')
+
+    def winners(self, file_no, sheet):
+        """Row numbers of sheet in file file_no that won their key, ascending."""
+        if self.db is None:
+            return iter(sorted(v[4] for v in self.rows.values() if v[2] == file_no and v[3] == sheet))
+        return (r for (r,) in self.db.execute(
+            'SELECT r FROM idx WHERE f = ? AND sheet = ? ORDER BY r', (file_no, sheet)))
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            os.remove(self.path)
+
+def merge_key_value(v):
+    if isinstance(v, (datetime, date)):
+        return core.clean_date(v)
+    return core.clean_str(v)
+
+def merge_rank(values, file_no, mtime):
+    """Comparable rank of a row under MERGE_PRECEDENCE (a string, so SQLite compares it too)."""
+    parts = []
+    for rule in MERGE_PRECEDENCE:
+        if rule == 'complete':
+            v = sum(1 for x in values if x is not None and core.clean_str(x) is not None)
+        elif rule == 'last':
+            v = file_no
+        elif rule == 'first':
+            v = -file_no
+        else:   # newest
+            v = mtime
+        parts.append(f'{v + 10**12:014d}')
+    return ':'.join(parts)
+
+def merge_sheet_rows(path, sheet):
+    """(row number, {header: value}) for the non-empty rows of sheet, streamed."""
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet not in wb.sheetnames:
+            return
+        rows = wb[sheet].iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        cols = [(i, str(h).strip()) for i, h in enumerate(header) if h is not None and str(h).strip()]
+        for n, row in enumerate(rows, 2):
+            data = {h: row[i] for i, h in cols if i < len(row)}
+            if any(v is not None for v in data.values()):
+                yield n, data
+    finally:
+        wb.close()
+
+def merge_workbooks(paths, out_path):
+    """Merge the workbooks at paths into out_path. Returns True if it was written."""
+    unknown = [r for r in MERGE_PRECEDENCE if r not in ('complete', 'last', 'first', 'newest')]
+    if unknown or not MERGE_PRECEDENCE:
+        print(f'ERROR: MERGE_PRECEDENCE: unknown rule(s) {", ".join(unknown) or "(none given)"}; '
+              f'use complete, last, first or newest')
+        return False
+    print(f'\n=== Merging {len(paths)} workbooks (precedence: {", ".join(MERGE_PRECEDENCE)}) ===\n')
+    sheets = {}   # sheet → merged header list, in first-seen order
+    for path in paths:
+        wb = openpyxl.load_workbook(path, read_only=True)
+        for name in wb.sheetnames:
+            header = next(wb[name].iter_rows(max_row=1, values_only=True), None) or ()
+            cols = sheets.setdefault(name, [])
+            cols.extend(h for h in (str(h).strip() for h in header if h is not None) if h and h not in cols)
+        wb.close()
+
+    index = MergeIndex(MERGE_INDEX_MEMORY)
+    stats = {}    # sheet → [rows read, duplicates, conflicting duplicates]
+    try:
+        for file_no, path in enumerate(paths):
+            mtime = int(os.path.getmtime(path))
+            for sheet in sheets:
+                keys = MERGE_KEYS.get(sheet)
+                st = stats.setdefault(sheet, [0, 0, 0])
+                for n, data in merge_sheet_rows(path, sheet):
+                    st[0] += 1
+                    if not keys:
+                        continue
+                    key = [merge_key_value(data.get(k)) for k in keys]
+                    if not any(key):
+                        continue
+                    key_hash = int.from_bytes(hashlib.blake2b(
+                        repr((sheet, key)).encode(), digest_size=8).digest(), 'big', signed=True)
+                    values = [data.get(h) for h in sheets[sheet]]
+                    digest = int.from_bytes(hashlib.blake2b(
+                        repr([merge_key_value(v) for v in values]).encode(), digest_size=8).digest(),
+                        'big', signed=True)
+                    differs = index.offer(key_hash, merge_rank(values, file_no, mtime), digest,
+                                          (file_no, sheet, n))
+                    if differs is not None:
+                        st[1] += 1
+                        st[2] += differs
+
+        out = openpyxl.Workbook(write_only=True)
+        kept_total = 0
+        for sheet, header in sheets.items():
+            ws = out.create_sheet(sheet)
+            ws.append(header)
+            keyed = sheet in MERGE_KEYS
+            kept = 0
+            for file_no, path in enumerate(paths):
+                winners = index.winners(file_no, sheet) if keyed else iter(())
+                next_win = next(winners, None)
+                for n, data in merge_sheet_rows(path, sheet):
+                    if keyed:
+                        while next_win is not None and next_win < n:
+                            next_win = next(winners, None)
+                        key = [merge_key_value(data.get(k)) for k in MERGE_KEYS[sheet]]
+                        if any(key) and n != next_win:
+                            continue
+                    ws.append([data.get(h) for h in header])
+                    kept += 1
+            kept_total += kept
+            read, dupes, conflicts = stats.get(sheet, (0, 0, 0))
+            note = f', {dupes} duplicates merged ({conflicts} with differing data)' if dupes else ''
+            print(f'  {sheet}: {read} rows read, {kept} kept{note}')
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        out.save(out_path)
+    finally:
+        index.close()
+    print(f'\n  Merged workbook: {out_path} ({kept_total} rows)')
+    return True
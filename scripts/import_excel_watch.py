@@ -0,0 +1,146 @@
+"""Watch mode for import-excel-data.py (--watch)."""
+
+import openpyxl
+import hashlib
+import json
+import os
+import time
+import traceback
+import urllib.request
+
+# The import-excel-data.py module, set by it when it loads this one
+core = None
+
+# Stays running and re-imports the workbook whenever it is saved. A save is
+# picked up once the file has been unchanged for WATCH_DEBOUNCE seconds
+# (default 3, polled every WATCH_INTERVAL, default 1), so editors writing in
+# several steps trigger one import. Each sheet's cell values are fingerprinted
+# and only the tables of sheets that changed are re-imported, through the
+# --only path (dependents included, existing ids kept). Between runs the
+# process keeps its database connection, HTTP keep-alive connections, column
+# types and code → id maps. The fingerprints of the last successful import
+# are kept in IMPORT_LOG_DIR/watch-<tenant>.json, so a restart does not
+# re-import an unchanged workbook; without that file the first run is a full
+# import of TENANT_ID (only its rows are deleted, never other tenants').
+# Watching a directory imports its most recently saved .xlsx.
+WATCH_INTERVAL = float(os.environ.get('WATCH_INTERVAL', '1'))
+WATCH_DEBOUNCE = float(os.environ.get('WATCH_DEBOUNCE', '3'))
+
+# Tables each workbook sheet is imported into
+SHEET_TABLES = {
+    'Lookups': ['lookups'],
+    'Staff Position': ['staff_positions'],
+    'Service': ['services'],
+    'Task': ['tasks'],
+    'Service Task': ['service_tasks'],
+    'Client': ['clients'],
+    'Staff': ['staff'],
+    'Site': ['sites'],
+    'Subcontractor': ['subcontractors'],
+    'Site Job': ['site_jobs'],
+    'Job Task': ['job_tasks'],
+    'Supply': ['supply_catalog'],
+    'Equipment': ['equipment'],
+    'Equipment Assignment': ['equipment_assignments'],
+    'Supply Assignment': ['site_supplies'],
+    'Inventory Count': ['inventory_counts'],
+    'Inventory Count Detail': ['inventory_count_details'],
+}
+
+def sheet_fingerprints(wb):
+    """{sheet: digest of its cell values}; formatting and trailing blanks don't count."""
+    prints = {}
+    for ws in wb.worksheets:
+        h = hashlib.blake2b(digest_size=16)
+        for row in ws.iter_rows(values_only=True):
+            end = len(row)
+            while end and row[end - 1] is None:
+                end -= 1
+            if end:
+                h.update(repr(row[:end]).encode())
+                h.update(b'\n')
+        prints[ws.title] = h.hexdigest()
+    return prints
+
+def changed_tables(prints, old):
+    """Tables to re-import for the sheets whose fingerprint differs from old (None: all)."""
+    if old is None:
+        return None
+    changed = {s for s in set(prints) | set(old) if prints.get(s) != old.get(s)}
+    return [t for t in core.IMPORT_TABLES if any(t in SHEET_TABLES.get(s, ()) for s in changed)]
+
+def watch_target(path):
+    """The workbook to import: path itself, or the newest .xlsx in a directory."""
+    if not os.path.isdir(path):
+        return path
+    books = [os.path.join(path, n) for n in os.listdir(path)
+             if n.lower().endswith('.xlsx') and not n.startswith(('~$', '.'))]
+    return max(books, key=os.path.getmtime, default=None)
+
+def file_signature(path):
+    """(path, mtime, size), or None if there is no file to import yet."""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return path, st.st_mtime_ns, st.st_size
+
+def sync_workbook(book, state, state_path):
+    """Import what changed in book since state. Returns the new state."""
+    stamp = time.strftime('%H:%M:%S')
+    try:
+        wb = openpyxl.load_workbook(book, data_only=True)
+    except Exception as e:
+        print(f'[{stamp}] WARN: could not read {book}, waiting for the next save: {str(e)[:200]}')
+        return state
+    prints = sheet_fingerprints(wb)
+    only = changed_tables(prints, state.get('sheets'))
+    if only == []:
+        print(f'[{stamp}] {os.path.basename(book)}: no imported sheet changed')
+        state = {'sheets': prints}
+        write_watch_state(state_path, state)
+        return state
+    print(f'\n[{stamp}] {os.path.basename(book)}: '
+          f'{"full import" if only is None else "re-importing " + ", ".join(only)}')
+    started = time.monotonic()
+    core.EXCEL_PATH = book
+    try:
+        core.run_import(only, tenant_scoped=True, wb=wb)
+    except SystemExit as e:
+        print(f'\n  Import failed (exit status {e.code}); the changes are retried on the next save')
+        return state
+    except Exception:
+        traceback.print_exc()
+        print('\n  Import failed; the changes are retried on the next save')
+        return state
+    state = {'sheets': prints}
+    write_watch_state(state_path, state)
+    print(f'\n[{time.strftime("%H:%M:%S")}] Synced in {time.monotonic() - started:.1f}s')
+    return state
+
+def write_watch_state(path, state):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+def watch(path):
+    """Poll path (a workbook or a drop directory) and sync every settled save."""
+    state_path = os.path.join(os.environ.get('IMPORT_LOG_DIR', 'import-logs'), f'watch-{core.TENANT_ID}.json')
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+    urllib.request.install_opener(urllib.request.build_opener(core.KeepAliveHandler()))
+    print(f'Watching {path} for TENANT_ID {core.TENANT_ID} (Ctrl-C to stop)')
+    seen, since, handled = None, 0.0, None
+    while True:
+        sig = file_signature(watch_target(path))
+        if sig != seen:
+            seen, since = sig, time.monotonic()
+        elif sig and sig != handled and time.monotonic() - since >= WATCH_DEBOUNCE:
+            handled = sig
+            state = sync_workbook(sig[0], state, state_path)
+        time.sleep(WATCH_INTERVAL)
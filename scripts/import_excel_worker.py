@@ -0,0 +1,207 @@
+"""Import worker service for import-excel-data.py (--serve)."""
+
+import openpyxl
+import contextlib
+import hmac
+import http.server
+import ipaddress
+import json
+import queue
+import re
+import sys
+import threading
+import traceback
+import urllib.parse
+import urllib.request
+import uuid
+import os
+from datetime import datetime
+
+import import_excel_watch
+
+# The import-excel-data.py module, set by it when it loads this one
+core = None
+
+# A resident importer for the web app's upload flow, so an upload does not
+# pay interpreter startup, connection setup and schema/id-map loading. A
+# small JSON API queues uploaded workbooks and one worker thread imports
+# them in order (module state is per run, so imports never overlap):
+#
+#   POST /jobs?tenant_id=<uuid>[&only=t1,t2][&full=1]   body: the .xlsx
+#        → 202 {"id", "status": "queued", ...}
+#   GET  /jobs/<id>          → status: queued | running | succeeded | failed,
+#                              rows and per-table counts, error
+#   GET  /jobs/<id>/report   → the import's full output (text/plain)
+#   GET  /health             → {"status": "ok", "queued", "running"}
+#
+# Each tenant's first job is a full, tenant-scoped import. Later jobs
+# re-import only the tables of sheets whose content changed since that
+# tenant's last successful full or incremental job (as --watch does);
+# full=1 forces a full import. When WORKER_TOKEN is set, requests need
+# "Authorization: Bearer <token>"; without it the worker only listens on
+# loopback, since any upload replaces a tenant's data. Uploads and reports are kept in
+# WORKER_DIR (default IMPORT_LOG_DIR/worker); uploads are deleted once
+# imported.
+WORKER_TOKEN = os.environ.get('WORKER_TOKEN', '')
+WORKER_DIR = os.environ.get('WORKER_DIR', '') or os.path.join(
+    os.environ.get('IMPORT_LOG_DIR', 'import-logs'), 'worker')
+WORKER_MAX_UPLOAD_MB = int(os.environ.get('WORKER_MAX_UPLOAD_MB', '50'))
+WORKER_KEEP_JOBS = 500   # finished jobs remembered for status polling
+
+worker_jobs = {}           # job id → job, in submission order
+worker_queue = queue.Queue()
+worker_prints = {}         # tenant → sheet fingerprints of its last synced workbook
+_worker_lock = threading.Lock()
+
+def job_view(job):
+    """The job as the API returns it."""
+    return {k: v for k, v in job.items() if k not in ('path', 'report')}
+
+def run_job(job):
+    """Import one queued upload; the job dict is updated in place."""
+    core.TENANT_ID, core.EXCEL_PATH = job['tenant_id'], job['path']
+    job.update(status='running', started_at=datetime.now().isoformat(timespec='seconds'))
+    prints = None
+    try:
+        with open(job['report'], 'w') as log, core.thread_log(log):
+            wb = openpyxl.load_workbook(job['path'], data_only=True)
+            only = job['only']
+            if only is None:
+                prints = import_excel_watch.sheet_fingerprints(wb)
+                if not job['full']:
+                    only = import_excel_watch.changed_tables(prints, worker_prints.get(core.TENANT_ID))
+            job['tables'] = 'all' if only is None else only
+            loaded = {}
+            if only == []:
+                print('No imported sheet changed since the last import; nothing to do.')
+            else:
+                core.run_import(only, tenant_scoped=True, wb=wb)
+                loaded = dict(core.loaded_counts)
+        if prints is not None:
+            worker_prints[core.TENANT_ID] = prints
+        job.update(status='succeeded', rows=sum(loaded.values()), loaded=loaded)
+    except SystemExit as e:
+        job.update(status='failed', error=f'exited with status {e.code}')
+    except Exception as e:
+        job.update(status='failed', error=f'{type(e).__name__}: {" ".join(str(e).split())[:200]}')
+        with open(job['report'], 'a') as log:
+            traceback.print_exc(file=log)
+    finally:
+        job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        with contextlib.suppress(OSError):
+            os.remove(job['path'])
+
+def worker_loop():
+    while True:
+        run_job(worker_jobs[worker_queue.get()])
+
+def submit_job(tenant_id, body, only=None, full=False):
+    """Save an uploaded workbook and queue it. Returns the job."""
+    job_id = core.gen_uuid()
+    path = os.path.join(WORKER_DIR, f'{job_id}.xlsx')
+    with open(path, 'wb') as f:
+        f.write(body)
+    job = {
+        'id': job_id, 'tenant_id': tenant_id, 'status': 'queued',
+        'submitted_at': datetime.now().isoformat(timespec='seconds'),
+        'started_at': None, 'finished_at': None, 'only': only, 'full': full,
+        'tables': None, 'rows': None, 'loaded': None, 'error': None,
+        'path': path, 'report': os.path.join(WORKER_DIR, f'{job_id}.log'),
+    }
+    with _worker_lock:
+        worker_jobs[job_id] = job
+        finished = [k for k, j in worker_jobs.items() if j['finished_at']]
+        for k in finished[:max(0, len(finished) - WORKER_KEEP_JOBS)]:
+            del worker_jobs[k]
+    worker_queue.put(job_id)
+    return job
+
+class WorkerHandler(http.server.BaseHTTPRequestHandler):
+    server_version = 'ImportWorker'
+
+    def send_body(self, code, data, content_type='application/json'):
+        if not isinstance(data, bytes):
+            data = json.dumps(data, default=core.json_default).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def authorized(self):
+        if WORKER_TOKEN and not hmac.compare_digest(
+                self.headers.get('Authorization', '').encode(), f'Bearer {WORKER_TOKEN}'.encode()):
+            self.send_body(401, {'error': 'missing or wrong bearer token'})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        path = urllib.parse.urlsplit(self.path).path.rstrip('/')
+        if path == '/health':
+            running = next((j['id'] for j in list(worker_jobs.values()) if j['status'] == 'running'), None)
+            return self.send_body(200, {'status': 'ok', 'queued': worker_queue.qsize(), 'running': running})
+        m = re.fullmatch(r'/jobs/([0-9a-f-]{36})(/report)?', path)
+        job = worker_jobs.get(m.group(1)) if m else None
+        if not job:
+            return self.send_body(404, {'error': 'no such job'})
+        if not m.group(2):
+            return self.send_body(200, job_view(job))
+        try:
+            with open(job['report'], 'rb') as f:
+                report = f.read()
+        except OSError:
+            report = b''
+        self.send_body(200, report, 'text/plain; charset=utf-8')
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        url = urllib.parse.urlsplit(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            return self.send_body(404, {'error': 'not found'})
+        q = urllib.parse.parse_qs(url.query)
+        try:
+            tenant_id = str(uuid.UUID(q.get('tenant_id', [''])[0]))
+        except ValueError:
+            return self.send_body(400, {'error': 'tenant_id must be a UUID'})
+        only = [t.strip() for t in ','.join(q.get('only', [])).split(',') if t.strip()] or None
+        unknown = [t for t in only or () if t not in core.IMPORT_TABLES]
+        if unknown:
+            return self.send_body(400, {'error': f'unknown table(s) {", ".join(unknown)}'})
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return self.send_body(400, {'error': 'send the workbook as the request body'})
+        if length > WORKER_MAX_UPLOAD_MB * 1024 * 1024:
+            return self.send_body(413, {'error': f'workbook larger than {WORKER_MAX_UPLOAD_MB} MB'})
+        job = submit_job(tenant_id, self.rfile.read(length), only,
+                         q.get('full', [''])[0] in ('1', 'true', 'yes'))
+        self.send_body(202, job_view(job))
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def serve(bind):
+    """Run the worker API on [host:]port until interrupted."""
+    host, _, port = bind.rpartition(':')
+    host = host or '127.0.0.1'
+    if not WORKER_TOKEN and not is_loopback(host):
+        print(f'ERROR: --serve {bind}: set WORKER_TOKEN to listen on a non-loopback address')
+        sys.exit(1)
+    os.makedirs(WORKER_DIR, exist_ok=True)
+    urllib.request.install_opener(urllib.request.build_opener(core.KeepAliveHandler()))
+    sys.stdout = core.ThreadStdout(sys.stdout)   # jobs print to their reports (run_job)
+    # Load what every job needs before the first upload arrives
+    core.column_types = core.load_column_types()
+    if core.IMPORT_BACKEND == 'copy':
+        core.pg_connect()
+    threading.Thread(target=worker_loop, name='import-worker', daemon=True).start()
+    server = http.server.ThreadingHTTPServer((host, int(port)), WorkerHandler)
+    print(f'Import worker on http://{host}:{port}/ (uploads in {WORKER_DIR}/, Ctrl-C to stop)')
+    server.serve_forever()
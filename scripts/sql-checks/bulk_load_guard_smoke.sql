@@ -0,0 +1,85 @@
+-- ============================================================================
+-- Bulk-load guard smoke checks
+-- ============================================================================
+-- Usage (as a superuser, e.g. against the local stack):
+--   psql "$DATABASE_URL" -f scripts/sql-checks/bulk_load_guard_smoke.sql
+--
+-- This script validates that bulk_load_active() (20261019100002,
+-- 20261019100009) turns the shared trigger shortcuts on for a direct loader
+-- session only, never for the PostgREST authenticator, and that a cached
+-- answer from another transaction is ignored. Every check runs in a
+-- transaction that is rolled back.
+-- ============================================================================
+
+\set ON_ERROR_STOP on
+\echo 'Bulk-load guard smoke: validating bulk_load_active() per session type...'
+
+-- Direct session: gleamops.bulk_load = 'on' enables bulk-load mode
+BEGIN;
+SET LOCAL gleamops.bulk_load = 'on';
+DO $$
+BEGIN
+  IF NOT bulk_load_active() THEN
+    RAISE EXCEPTION 'bulk_load_active() is false for a direct session with gleamops.bulk_load = on';
+  END IF;
+END $$;
+ROLLBACK;
+
+-- Direct session: off by default, and a mark from another transaction is ignored
+BEGIN;
+DO $$
+BEGIN
+  IF bulk_load_active() THEN
+    RAISE EXCEPTION 'bulk_load_active() is true with no bulk-load setting';
+  END IF;
+END $$;
+ROLLBACK;
+
+BEGIN;
+DO $$
+BEGIN
+  PERFORM set_config('gleamops.bulk_load_cache', 'on:' || (txid_current() - 1)::text, true);
+  IF bulk_load_active() THEN
+    RAISE EXCEPTION 'bulk_load_active() accepted a mark from another transaction';
+  END IF;
+END $$;
+ROLLBACK;
+
+-- PostgREST session (session_user authenticator)
+BEGIN;
+SET LOCAL SESSION AUTHORIZATION authenticator;
+SET LOCAL gleamops.bulk_load = 'on';
+DO $$
+BEGIN
+  IF session_user <> 'authenticator' THEN
+    RAISE EXCEPTION 'expected session_user authenticator, got %', session_user;
+  END IF;
+  IF bulk_load_active() THEN
+    RAISE EXCEPTION 'bulk_load_active() honoured gleamops.bulk_load = on for the authenticator';
+  END IF;
+END $$;
+
+-- Service-role JWT, but no open import_bulk_sessions row behind the header
+SET LOCAL gleamops.bulk_load = '';
+DO $$
+BEGIN
+  PERFORM set_config('request.jwt.claims', '{"role": "service_role"}', true);
+  PERFORM set_config('request.headers', json_build_object('x-bulk-load-session', gen_random_uuid())::text, true);
+  IF bulk_load_active() THEN
+    RAISE EXCEPTION 'bulk_load_active() is true for a bulk-load session that does not exist';
+  END IF;
+END $$;
+
+-- Only the owner's SECURITY DEFINER functions may mark a transaction
+DO $$
+BEGIN
+  BEGIN
+    PERFORM bulk_load_this_transaction();
+  EXCEPTION WHEN insufficient_privilege THEN
+    RETURN;
+  END;
+  RAISE EXCEPTION 'the authenticator could call bulk_load_this_transaction()';
+END $$;
+ROLLBACK;
+
+\echo 'Bulk-load guard smoke: OK'
@@ -0,0 +1,27 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'import-excel-data.py')
+
+
+@pytest.fixture(scope='session')
+def importer():
+    """scripts/import-excel-data.py loaded as a module (its name has hyphens)."""
+    spec = importlib.util.spec_from_file_location('import_excel_data', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def imp(importer, monkeypatch):
+    """The importer with its per-run state reset for one test."""
+    monkeypatch.setattr(importer, 'sequence_maxes', {})
+    monkeypatch.setattr(importer, 'ONLY', None)
+    monkeypatch.setattr(importer, 'db_ids', {})
+    monkeypatch.setattr(importer, 'TENANT_ID', 'a0000000-0000-0000-0000-000000000001')
+    return importer
@@ -0,0 +1,264 @@
+"""Unit tests for the pure parts of scripts/import-excel-data.py."""
+
+from datetime import date
+
+import openpyxl
+import pytest
+
+
+# ── dedupe ───────────────────────────────────────────────────────────────────
+ROWS = [
+    {'Code': 'A', 'Name': None, 'n': 1},
+    {'Code': 'B', 'Name': 'b', 'n': 2},
+    {'Code': 'A', 'Name': 'a', 'n': 3},
+    {'Code': None, 'Name': 'x', 'n': 4},
+    {'Code': 'B', 'Name': None, 'n': 5},
+]
+
+
+def code(r):
+    return r['Code']
+
+
+@pytest.mark.parametrize('keep, kept', [
+    ('first', [1, 2, 4]),
+    ('last', [3, 5, 4]),
+    ('complete', [3, 2, 4]),
+    (lambda r: -r['n'], [1, 2, 4]),
+])
+def test_dedupe_keep_policies(imp, keep, kept):
+    assert [r['n'] for r in imp.dedupe(ROWS, code, keep)] == kept
+
+
+def test_dedupe_passes_unkeyed_rows_through(imp):
+    rows = [{'Code': None, 'n': 1}, {'Code': None, 'n': 2}]
+    assert imp.dedupe(rows, code) == rows
+
+
+def test_dedupe_keeps_keys_that_only_collide_as_text(imp):
+    rows = [{'Code': 1}, {'Code': '1'}, {'Code': (1,)}]
+    assert imp.dedupe(rows, code) == rows
+
+
+def test_dedupe_reports_duplicates(imp, capsys):
+    imp.dedupe(ROWS, code, 'last', 'client')
+    assert 'Deduped: 2 duplicate client rows removed (kept last occurrence; e.g. A, B)' in capsys.readouterr().out
+
+
+# ── coerce_problems ──────────────────────────────────────────────────────────
+@pytest.fixture
+def types(imp, monkeypatch):
+    monkeypatch.setattr(imp, 'column_types', {'sites': {
+        'id': 'uuid', 'name': 'text', 'number_of_floors': 'integer', 'square_footage': 'numeric',
+    }})
+
+
+def test_coerce_problems_accepts_matching_rows(imp, types):
+    assert imp.coerce_problems('sites', {'id': 'x', 'name': 'A', 'number_of_floors': '3.0',
+                                         'square_footage': 12.5}) == []
+
+
+def test_coerce_problems_unknown_column(imp, types):
+    assert imp.coerce_problems('sites', {'name': 'A', 'floors': 3}) == ['floors: no such column']
+
+
+def test_coerce_problems_fractional_integer(imp, types):
+    assert imp.coerce_problems('sites', {'number_of_floors': 2.5}) == ['number_of_floors: not a whole number']
+
+
+def test_coerce_problems_unknown_table(imp, types):
+    assert imp.coerce_problems('clients', {'anything': 1}) == []
+
+
+def test_coerce_rows_skips_problem_rows(imp, types):
+    rows = [{'name': 'A', 'number_of_floors': '2'}, {'name': 'B', 'number_of_floors': 1.5}]
+    assert imp.coerce_rows('sites', rows) == [{'name': 'A', 'number_of_floors': 2}]
+
+
+# ── select_only / TABLE_PARENTS ──────────────────────────────────────────────
+def test_only_closure_adds_dependents(imp):
+    closure = imp.only_closure(['sites'])
+    assert {'sites', 'site_jobs', 'job_tasks', 'equipment_assignments', 'site_supplies',
+            'inventory_counts', 'inventory_count_details', 'site_supply_positions',
+            'recurrence_rules', 'work_tickets', 'ticket_assignments'} <= closure
+    assert not closure & {'clients', 'staff', 'services', 'tasks', 'lookups'}
+
+
+def test_only_closure_of_a_leaf_is_itself(imp):
+    assert imp.only_closure(['ticket_assignments']) == {'ticket_assignments'}
+
+
+def test_select_only_loads_ids_of_every_ancestor(imp, monkeypatch):
+    loaded = []
+    monkeypatch.setattr(imp, 'load_id_maps', lambda tables: loaded.extend(tables) or {})
+    imp.select_only(['job_tasks'])
+    assert imp.ONLY == {'job_tasks'}
+    # job_tasks → site_jobs → sites → clients, staff; site_jobs → services, subcontractors
+    assert set(loaded) == {'job_tasks', 'site_jobs', 'tasks', 'sites', 'services',
+                           'subcontractors', 'clients', 'staff'} & set(imp.ID_MAP_KEYS)
+
+
+def test_select_only_rejects_unknown_tables(imp):
+    with pytest.raises(SystemExit):
+        imp.select_only(['no_such_table'])
+
+
+# ── subset_workbook ──────────────────────────────────────────────────────────
+def workbook(sheets):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        ws = wb.create_sheet(name)
+        for row in rows:
+            ws.append(row)
+    return wb
+
+
+def sheet_values(wb, name, column):
+    rows = list(wb[name].iter_rows(values_only=True))
+    i = rows[0].index(column)
+    return [r[i] for r in rows[1:]]
+
+
+@pytest.fixture
+def book():
+    return workbook({
+        'Lookups': [('Category', 'Code'), ('status', 'A'), ('status', 'B')],
+        'Client': [('Client Code',), ('CLI-1',), ('CLI-2',)],
+        'Staff': [('Staff Code', 'First Name', 'Last Name', 'Supervisor Code'),
+                  ('STF-1-A', 'Ann', 'Boss', None),
+                  ('STF-1-B', 'Ann', 'Boss', None),
+                  ('STF-2', 'Sam', 'Lead', 'STF-1-A'),
+                  ('STF-3', 'Joe', 'Other', None)],
+        'Site': [('Site Code', 'Client Code', 'Supervisor Code'),
+                 ('SIT-1', 'CLI-1', 'STF-2'), ('SIT-2', 'CLI-2', 'STF-3')],
+        'Service': [('Service Code',), ('SER-1',), ('SER-2',)],
+        'Task': [('Task Code',), ('TSK-1',), ('TSK-2',), ('TSK-3',)],
+        'Service Task': [('Service Code', 'Task Code'), ('SER-1', 'TSK-2'), ('SER-2', 'TSK-3')],
+        'Site Job': [('Job Code', 'Site Code', 'Service Code', 'Subcontractor Code', 'Job Assigned To'),
+                     ('JOB-1', 'SIT-1', 'SER-1', None, None), ('JOB-2', 'SIT-2', 'SER-2', None, 'Joe Other')],
+        'Job Task': [('Job Code', 'Task Code'), ('JOB-1', 'TSK-1'), ('JOB-2', 'TSK-3')],
+    })
+
+
+def test_subset_by_site_keeps_the_fk_closure(imp, book):
+    out = imp.subset_workbook(book, 'SIT-1')
+    assert sheet_values(out, 'Site', 'Site Code') == ['SIT-1']
+    assert sheet_values(out, 'Client', 'Client Code') == ['CLI-1']
+    assert sheet_values(out, 'Site Job', 'Job Code') == ['JOB-1']
+    assert sheet_values(out, 'Service', 'Service Code') == ['SER-1']
+    assert sheet_values(out, 'Task', 'Task Code') == ['TSK-1', 'TSK-2']
+    # the site's supervisor, that supervisor's supervisor, and both of their -A/-B rows
+    assert sheet_values(out, 'Staff', 'Staff Code') == ['STF-1-A', 'STF-1-B', 'STF-2']
+    assert sheet_values(out, 'Lookups', 'Code') == ['A', 'B']
+
+
+def test_subset_by_client_count(imp, book):
+    out = imp.subset_workbook(book, '1')
+    assert sheet_values(out, 'Client', 'Client Code') == ['CLI-1']
+    assert sheet_values(out, 'Site', 'Site Code') == ['SIT-1']
+
+
+def test_subset_follows_job_assignees_by_name(imp, book):
+    out = imp.subset_workbook(book, 'SIT-2')
+    assert sheet_values(out, 'Staff', 'Staff Code') == ['STF-3']
+
+
+# ── expand_schedule ──────────────────────────────────────────────────────────
+def job(**fields):
+    return {'id': 'job-1', 'job_code': 'JOB-1', 'site_id': 'site-1', 'status': 'ACTIVE', **fields}
+
+
+@pytest.fixture
+def horizon(imp, monkeypatch):
+    monkeypatch.setattr(imp, 'SCHEDULE_START', '2026-03-01')   # a Sunday
+    monkeypatch.setattr(imp, 'SCHEDULE_HORIZON_DAYS', 28)
+
+
+def ticket_dates(tickets):
+    return [t['scheduled_date'] for t in tickets]
+
+
+def test_expand_schedule_weekly_days(imp, horizon):
+    rules, tickets, _ = imp.expand_schedule([job(frequency='2X_WEEK', schedule_days='Tue/Thu')], {}, {})
+    assert rules[0]['rrule_text'] == 'FREQ=WEEKLY;BYDAY=TU,TH'
+    assert len(tickets) == 8
+    assert {date.fromisoformat(d).isoweekday() for d in ticket_dates(tickets)} == {2, 4}
+    assert tickets[0]['ticket_code'] == 'TKT-JOB-1-20260303'
+
+
+def test_expand_schedule_day_ranges_and_defaults(imp, horizon):
+    _, ranged, _ = imp.expand_schedule([job(frequency='DAILY', schedule_days='Mon-Fri')], {}, {})
+    _, default, _ = imp.expand_schedule([job(frequency='DAILY')], {}, {})
+    assert ticket_dates(ranged) == ticket_dates(default)
+    assert len(ranged) == 20
+
+
+def test_expand_schedule_biweekly_and_monthly(imp, horizon):
+    _, biweekly, _ = imp.expand_schedule([job(frequency='BIWEEKLY', schedule_days='WED')], {}, {})
+    assert ticket_dates(biweekly) == ['2026-03-04', '2026-03-18']
+    _, monthly, _ = imp.expand_schedule([job(frequency='MONTHLY', next_service_date='2026-03-10')], {}, {})
+    assert ticket_dates(monthly) == ['2026-03-10']
+
+
+def test_expand_schedule_starts_at_next_service_date(imp, horizon):
+    _, tickets, _ = imp.expand_schedule([job(frequency='WEEKLY', schedule_days='MON',
+                                             next_service_date='2026-03-15')], {}, {})
+    assert ticket_dates(tickets) == ['2026-03-16', '2026-03-23']
+
+
+def test_expand_schedule_skips_inactive_and_as_needed(imp, horizon):
+    rules, tickets, _ = imp.expand_schedule([job(frequency='WEEKLY', status='ON_HOLD'),
+                                             job(frequency='AS_NEEDED')], {}, {})
+    assert rules == [] and tickets == []
+
+
+def test_expand_schedule_assigns_by_code_or_name(imp, horizon):
+    jobs = [job(frequency='WEEKLY', schedule_days='MON', job_assigned_to='STF-1-B'),
+            job(id='job-2', job_code='JOB-2', frequency='WEEKLY', schedule_days='MON',
+                job_assigned_to='Ann Boss')]
+    _, tickets, assignments = imp.expand_schedule(jobs, {'STF-1': 'staff-1'}, {'ann boss': 'staff-1'})
+    assert len(assignments) == len(tickets) == 8
+    assert {a['staff_id'] for a in assignments} == {'staff-1'}
+
+
+def test_expand_schedule_drops_overnight_end_time(imp, horizon):
+    rules, tickets, _ = imp.expand_schedule([job(frequency='WEEKLY', start_time='22:00',
+                                                 end_time='02:00')], {}, {})
+    assert rules[0]['end_time'] is None and tickets[0]['end_time'] is None
+
+
+# ── track_sequences ──────────────────────────────────────────────────────────
+def test_track_sequences_keeps_the_highest_number(imp):
+    imp.track_sequences('clients', [{'client_code': 'CLI-1002'}, {'client_code': 'CLI-1010'},
+                                    {'client_code': 'CLIX-9999'}, {'client_code': None}])
+    imp.track_sequences('clients', [{'client_code': 'CLI-1003'}])
+    assert imp.sequence_maxes == {'CLI': 1010}
+
+
+def test_track_sequences_reads_staff_variants(imp):
+    imp.track_sequences('staff', [{'staff_code': 'STF-1001-B'}, {'staff_code': 'STF-abc'}])
+    assert imp.sequence_maxes == {'STF': 1001}
+
+
+def test_track_sequences_ignores_tables_without_codes(imp):
+    imp.track_sequences('job_tasks', [{'task_code': 'TSK-5000'}])
+    assert imp.sequence_maxes == {}
+
+
+# ── history ids ──────────────────────────────────────────────────────────────
+def test_history_natural_keys_are_mapped_columns(imp):
+    for table, (_, code_header, columns) in imp.HISTORY_TABLES.items():
+        mapped = {col for _, col, _, _ in columns}
+        if code_header is None:
+            assert set(imp.HISTORY_NATURAL_KEYS[table]) <= mapped
+        else:
+            assert table not in imp.HISTORY_NATURAL_KEYS
+
+
+def test_history_id_depends_on_tenant_table_and_key(imp, monkeypatch):
+    one = imp.history_id('time_events', 'staff-1/CHECK_IN/2020-01-01T00:00:00Z/None')
+    assert one == imp.history_id('time_events', 'staff-1/CHECK_IN/2020-01-01T00:00:00Z/None')
+    assert one != imp.history_id('time_entries', 'staff-1/CHECK_IN/2020-01-01T00:00:00Z/None')
+    monkeypatch.setattr(imp, 'TENANT_ID', 'b0000000-0000-0000-0000-000000000002')
+    assert one != imp.history_id('time_events', 'staff-1/CHECK_IN/2020-01-01T00:00:00Z/None')
@@ -0,0 +1,386 @@
+-- ==========================================================================
+-- Migration: 20261019100000_bulk_import_rpcs
+-- Purpose: Server-side bulk import functions for the Excel importer
+--          (scripts/import-excel-data.py, IMPORT_BACKEND=rpc).
+--
+-- Each function takes a whole sheet as a JSON array keyed by business codes
+-- (client_code, site_code, job_code, task_code, ...), resolves every FK with
+-- one set-based join against the tenant's rows, and inserts the resolved
+-- rows with a single INSERT ... SELECT FROM jsonb_to_recordset(...).
+-- One sheet = one round trip; the client no longer needs code → UUID maps.
+--
+-- Every function returns:
+--   { "inserted": <rows inserted>, "unresolved": [<codes of rows whose
+--     required parent codes were not found>] }
+-- Duplicates are ignored (ON CONFLICT DO NOTHING), matching the importer's
+-- resolution=ignore-duplicates REST inserts.
+--
+-- Rollback:
+--   DROP FUNCTION IF EXISTS import_sites(UUID, JSONB);
+--   DROP FUNCTION IF EXISTS import_site_jobs(UUID, JSONB);
+--   DROP FUNCTION IF EXISTS import_job_tasks(UUID, JSONB);
+--   DROP FUNCTION IF EXISTS import_service_tasks(UUID, JSONB);
+--   DROP FUNCTION IF EXISTS import_site_supplies(UUID, JSONB);
+--   DROP FUNCTION IF EXISTS import_inventory_counts(UUID, JSONB);
+--   DROP FUNCTION IF EXISTS import_inventory_count_details(UUID, JSONB);
+--   DROP FUNCTION IF EXISTS import_equipment_assignments(UUID, JSONB);
+-- ==========================================================================
+
+-- ---------------------------------------------------------------------------
+-- 1. CRM: sites (client_code → client_id, supervisor_code → supervisor_id)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_sites(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH src AS (
+    SELECT * FROM jsonb_to_recordset(p_rows) AS r(
+      id UUID, client_code TEXT, supervisor_code TEXT, site_code TEXT, name TEXT,
+      status TEXT, status_date DATE, status_reason TEXT, service_start_date DATE,
+      address JSONB, alarm_code TEXT, alarm_system TEXT, alarm_company TEXT,
+      security_protocol TEXT, access_notes TEXT, entry_instructions TEXT,
+      parking_instructions TEXT, square_footage NUMERIC, number_of_floors INT,
+      employees_on_site INT, earliest_start_time TIME, latest_start_time TIME,
+      business_hours_start TIME, business_hours_end TIME, weekend_access BOOLEAN,
+      janitorial_closet_location TEXT, supply_storage_location TEXT,
+      water_source_location TEXT, dumpster_location TEXT, risk_level TEXT,
+      priority_level TEXT, osha_compliance_required BOOLEAN,
+      background_check_required BOOLEAN, last_inspection_date DATE,
+      next_inspection_date DATE, notes TEXT
+    )
+  ), resolved AS (
+    SELECT s.*, c.id AS client_id, st.id AS supervisor_id
+    FROM src s
+    LEFT JOIN clients c ON c.tenant_id = p_tenant_id AND c.client_code = s.client_code
+    LEFT JOIN staff st ON st.tenant_id = p_tenant_id
+      AND st.staff_code = regexp_replace(s.supervisor_code, '-[AB]$', '')
+  ), ins AS (
+    INSERT INTO sites (
+      id, tenant_id, client_id, site_code, name, status, status_date, status_reason,
+      service_start_date, address, alarm_code, alarm_system, alarm_company,
+      security_protocol, access_notes, entry_instructions, parking_instructions,
+      square_footage, number_of_floors, employees_on_site, earliest_start_time,
+      latest_start_time, business_hours_start, business_hours_end, weekend_access,
+      janitorial_closet_location, supply_storage_location, water_source_location,
+      dumpster_location, supervisor_id, risk_level, priority_level,
+      osha_compliance_required, background_check_required, last_inspection_date,
+      next_inspection_date, notes
+    )
+    SELECT
+      COALESCE(r.id, gen_random_uuid()), p_tenant_id, r.client_id, r.site_code, r.name,
+      COALESCE(r.status, 'ACTIVE'), r.status_date, r.status_reason,
+      r.service_start_date, COALESCE(r.address, '{}'::jsonb), r.alarm_code, r.alarm_system,
+      r.alarm_company, r.security_protocol, r.access_notes, r.entry_instructions,
+      r.parking_instructions, r.square_footage, r.number_of_floors, r.employees_on_site,
+      r.earliest_start_time, r.latest_start_time, r.business_hours_start,
+      r.business_hours_end, COALESCE(r.weekend_access, false),
+      r.janitorial_closet_location, r.supply_storage_location, r.water_source_location,
+      r.dumpster_location, r.supervisor_id, r.risk_level, r.priority_level,
+      COALESCE(r.osha_compliance_required, false), COALESCE(r.background_check_required, false),
+      r.last_inspection_date, r.next_inspection_date, r.notes
+    FROM resolved r
+    WHERE r.client_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+  )
+  SELECT jsonb_build_object(
+    'inserted', (SELECT count(*) FROM ins),
+    'unresolved', COALESCE((SELECT jsonb_agg(site_code) FROM resolved WHERE client_id IS NULL), '[]'::jsonb)
+  );
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 2. Jobs: site_jobs (site_code, service_code, subcontractor_code)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_site_jobs(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH src AS (
+    SELECT * FROM jsonb_to_recordset(p_rows) AS r(
+      id UUID, site_code TEXT, service_code TEXT, subcontractor_code TEXT,
+      job_code TEXT, job_name TEXT, status TEXT, frequency TEXT, job_type TEXT,
+      priority_level TEXT, schedule_days TEXT, staff_needed INT, start_time TIME,
+      end_time TIME, estimated_hours_per_service NUMERIC,
+      estimated_hours_per_month NUMERIC, last_service_date DATE,
+      next_service_date DATE, quality_score NUMERIC, billing_uom TEXT,
+      billing_amount NUMERIC, job_assigned_to TEXT, invoice_description TEXT,
+      specifications TEXT, special_requirements TEXT, notes TEXT
+    )
+  ), resolved AS (
+    SELECT s.*, si.id AS site_id, sv.id AS service_id, sc.id AS subcontractor_id
+    FROM src s
+    LEFT JOIN sites si ON si.tenant_id = p_tenant_id AND si.site_code = s.site_code
+    LEFT JOIN services sv ON sv.tenant_id = p_tenant_id AND sv.service_code = s.service_code
+    LEFT JOIN subcontractors sc ON sc.tenant_id = p_tenant_id AND sc.subcontractor_code = s.subcontractor_code
+  ), ins AS (
+    INSERT INTO site_jobs (
+      id, tenant_id, site_id, job_code, job_name, status, frequency, service_id,
+      job_type, priority_level, schedule_days, staff_needed, start_time, end_time,
+      estimated_hours_per_service, estimated_hours_per_month, last_service_date,
+      next_service_date, quality_score, billing_uom, billing_amount, job_assigned_to,
+      subcontractor_id, invoice_description, specifications, special_requirements, notes
+    )
+    SELECT
+      COALESCE(r.id, gen_random_uuid()), p_tenant_id, r.site_id, r.job_code, r.job_name,
+      COALESCE(r.status, 'ACTIVE'), COALESCE(r.frequency, 'WEEKLY'), r.service_id,
+      r.job_type, r.priority_level, r.schedule_days, r.staff_needed, r.start_time,
+      r.end_time, r.estimated_hours_per_service, r.estimated_hours_per_month,
+      r.last_service_date, r.next_service_date, r.quality_score, r.billing_uom,
+      r.billing_amount, r.job_assigned_to, r.subcontractor_id, r.invoice_description,
+      r.specifications, r.special_requirements, r.notes
+    FROM resolved r
+    WHERE r.site_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+  )
+  SELECT jsonb_build_object(
+    'inserted', (SELECT count(*) FROM ins),
+    'unresolved', COALESCE((SELECT jsonb_agg(job_code) FROM resolved WHERE site_id IS NULL), '[]'::jsonb)
+  );
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 3. Jobs: job_tasks (job_code → job_id, task_code → task_id)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_job_tasks(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH src AS (
+    SELECT * FROM jsonb_to_recordset(p_rows) AS r(
+      id UUID, job_code TEXT, task_code TEXT, task_name TEXT, planned_minutes INT,
+      qc_weight NUMERIC, is_required BOOLEAN, status TEXT, notes TEXT
+    )
+  ), resolved AS (
+    SELECT s.*, j.id AS job_id, t.id AS task_id
+    FROM src s
+    LEFT JOIN site_jobs j ON j.tenant_id = p_tenant_id AND j.job_code = s.job_code
+    LEFT JOIN tasks t ON t.tenant_id = p_tenant_id AND t.task_code = s.task_code
+  ), ins AS (
+    INSERT INTO job_tasks (
+      id, tenant_id, job_id, task_id, task_code, task_name, planned_minutes,
+      qc_weight, is_required, status, notes
+    )
+    SELECT
+      COALESCE(r.id, gen_random_uuid()), p_tenant_id, r.job_id, r.task_id, r.task_code,
+      r.task_name, r.planned_minutes, COALESCE(r.qc_weight, 1),
+      COALESCE(r.is_required, true), COALESCE(r.status, 'ACTIVE'), r.notes
+    FROM resolved r
+    WHERE r.job_id IS NOT NULL AND r.task_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+  )
+  SELECT jsonb_build_object(
+    'inserted', (SELECT count(*) FROM ins),
+    'unresolved', COALESCE((
+      SELECT jsonb_agg(job_code || '/' || task_code) FROM resolved
+      WHERE job_id IS NULL OR task_id IS NULL
+    ), '[]'::jsonb)
+  );
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 4. Service DNA: service_tasks (service_code, task_code)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_service_tasks(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH src AS (
+    SELECT * FROM jsonb_to_recordset(p_rows) AS r(
+      id UUID, service_code TEXT, task_code TEXT, frequency_default TEXT,
+      sequence_order INT, priority_level TEXT, is_required BOOLEAN,
+      estimated_minutes INT, quality_weight NUMERIC, notes TEXT
+    )
+  ), resolved AS (
+    SELECT s.*, sv.id AS service_id, t.id AS task_id
+    FROM src s
+    LEFT JOIN services sv ON sv.tenant_id = p_tenant_id AND sv.service_code = s.service_code
+    LEFT JOIN tasks t ON t.tenant_id = p_tenant_id AND t.task_code = s.task_code
+  ), ins AS (
+    INSERT INTO service_tasks (
+      id, tenant_id, service_id, task_id, frequency_default, sequence_order,
+      priority_level, is_required, estimated_minutes, quality_weight, notes
+    )
+    SELECT
+      COALESCE(r.id, gen_random_uuid()), p_tenant_id, r.service_id, r.task_id,
+      COALESCE(r.frequency_default, 'DAILY'), COALESCE(r.sequence_order, 0),
+      r.priority_level, COALESCE(r.is_required, true), r.estimated_minutes,
+      COALESCE(r.quality_weight, 1), r.notes
+    FROM resolved r
+    WHERE r.service_id IS NOT NULL AND r.task_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+  )
+  SELECT jsonb_build_object(
+    'inserted', (SELECT count(*) FROM ins),
+    'unresolved', COALESCE((
+      SELECT jsonb_agg(service_code || '/' || task_code) FROM resolved
+      WHERE service_id IS NULL OR task_id IS NULL
+    ), '[]'::jsonb)
+  );
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 5. Inventory: site_supplies (site_code, optional supply_code)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_site_supplies(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH src AS (
+    SELECT * FROM jsonb_to_recordset(p_rows) AS r(
+      id UUID, site_code TEXT, supply_code TEXT, name TEXT, category TEXT, notes TEXT
+    )
+  ), resolved AS (
+    SELECT s.*, si.id AS site_id, sc.id AS supply_id
+    FROM src s
+    LEFT JOIN sites si ON si.tenant_id = p_tenant_id AND si.site_code = s.site_code
+    LEFT JOIN supply_catalog sc ON sc.tenant_id = p_tenant_id AND sc.code = s.supply_code
+  ), ins AS (
+    INSERT INTO site_supplies (id, tenant_id, site_id, supply_id, name, category, notes)
+    SELECT
+      COALESCE(r.id, gen_random_uuid()), p_tenant_id, r.site_id, r.supply_id,
+      COALESCE(r.name, r.supply_code), r.category, r.notes
+    FROM resolved r
+    WHERE r.site_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+  )
+  SELECT jsonb_build_object(
+    'inserted', (SELECT count(*) FROM ins),
+    'unresolved', COALESCE((SELECT jsonb_agg(site_code) FROM resolved WHERE site_id IS NULL), '[]'::jsonb)
+  );
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 6. Inventory: inventory_counts (site_code → site_id)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_inventory_counts(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH src AS (
+    SELECT * FROM jsonb_to_recordset(p_rows) AS r(
+      id UUID, site_code TEXT, count_code TEXT, count_date DATE, status TEXT, notes TEXT
+    )
+  ), resolved AS (
+    SELECT s.*, si.id AS site_id
+    FROM src s
+    LEFT JOIN sites si ON si.tenant_id = p_tenant_id AND si.site_code = s.site_code
+  ), ins AS (
+    INSERT INTO inventory_counts (id, tenant_id, count_code, site_id, count_date, status, notes)
+    SELECT
+      COALESCE(r.id, gen_random_uuid()), p_tenant_id, r.count_code, r.site_id,
+      COALESCE(r.count_date, CURRENT_DATE), COALESCE(r.status, 'COMPLETED'), r.notes
+    FROM resolved r
+    WHERE r.site_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+  )
+  SELECT jsonb_build_object(
+    'inserted', (SELECT count(*) FROM ins),
+    'unresolved', COALESCE((SELECT jsonb_agg(count_code) FROM resolved WHERE site_id IS NULL), '[]'::jsonb)
+  );
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 7. Inventory: inventory_count_details (count_code, supply_code)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_inventory_count_details(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH src AS (
+    SELECT * FROM jsonb_to_recordset(p_rows) AS r(
+      id UUID, count_code TEXT, supply_code TEXT, actual_qty NUMERIC, notes TEXT
+    )
+  ), resolved AS (
+    SELECT s.*, ic.id AS count_id, sc.id AS supply_id
+    FROM src s
+    LEFT JOIN inventory_counts ic ON ic.tenant_id = p_tenant_id AND ic.count_code = s.count_code
+    LEFT JOIN supply_catalog sc ON sc.tenant_id = p_tenant_id AND sc.code = s.supply_code
+  ), ins AS (
+    INSERT INTO inventory_count_details (id, tenant_id, count_id, supply_id, actual_qty, notes)
+    SELECT
+      COALESCE(r.id, gen_random_uuid()), p_tenant_id, r.count_id, r.supply_id, r.actual_qty, r.notes
+    FROM resolved r
+    WHERE r.count_id IS NOT NULL AND r.supply_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+  )
+  SELECT jsonb_build_object(
+    'inserted', (SELECT count(*) FROM ins),
+    'unresolved', COALESCE((
+      SELECT jsonb_agg(count_code || '/' || COALESCE(supply_code, '?')) FROM resolved
+      WHERE count_id IS NULL OR supply_id IS NULL
+    ), '[]'::jsonb)
+  );
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 8. Assets: equipment_assignments (equipment_code, staff_code, site_code)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_equipment_assignments(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH src AS (
+    SELECT * FROM jsonb_to_recordset(p_rows) AS r(
+      id UUID, equipment_code TEXT, staff_code TEXT, site_code TEXT,
+      assigned_date DATE, returned_date DATE, notes TEXT
+    )
+  ), resolved AS (
+    SELECT s.*, e.id AS equipment_id, st.id AS staff_id, si.id AS site_id
+    FROM src s
+    LEFT JOIN equipment e ON e.tenant_id = p_tenant_id AND e.equipment_code = s.equipment_code
+    LEFT JOIN staff st ON st.tenant_id = p_tenant_id
+      AND st.staff_code = regexp_replace(s.staff_code, '-[AB]$', '')
+    LEFT JOIN sites si ON si.tenant_id = p_tenant_id AND si.site_code = s.site_code
+  ), ins AS (
+    INSERT INTO equipment_assignments (
+      id, tenant_id, equipment_id, staff_id, site_id, assigned_date, returned_date, notes
+    )
+    SELECT
+      COALESCE(r.id, gen_random_uuid()), p_tenant_id, r.equipment_id, r.staff_id, r.site_id,
+      COALESCE(r.assigned_date, CURRENT_DATE), r.returned_date, r.notes
+    FROM resolved r
+    WHERE r.equipment_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+  )
+  SELECT jsonb_build_object(
+    'inserted', (SELECT count(*) FROM ins),
+    'unresolved', COALESCE((SELECT jsonb_agg(equipment_code) FROM resolved WHERE equipment_id IS NULL), '[]'::jsonb)
+  );
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 9. Grants: importer only (service role)
+-- ---------------------------------------------------------------------------
+REVOKE ALL ON FUNCTION import_sites(UUID, JSONB) FROM PUBLIC;
+REVOKE ALL ON FUNCTION import_site_jobs(UUID, JSONB) FROM PUBLIC;
+REVOKE ALL ON FUNCTION import_job_tasks(UUID, JSONB) FROM PUBLIC;
+REVOKE ALL ON FUNCTION import_service_tasks(UUID, JSONB) FROM PUBLIC;
+REVOKE ALL ON FUNCTION import_site_supplies(UUID, JSONB) FROM PUBLIC;
+REVOKE ALL ON FUNCTION import_inventory_counts(UUID, JSONB) FROM PUBLIC;
+REVOKE ALL ON FUNCTION import_inventory_count_details(UUID, JSONB) FROM PUBLIC;
+REVOKE ALL ON FUNCTION import_equipment_assignments(UUID, JSONB) FROM PUBLIC;
+
+GRANT EXECUTE ON FUNCTION import_sites(UUID, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION import_site_jobs(UUID, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION import_job_tasks(UUID, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION import_service_tasks(UUID, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION import_site_supplies(UUID, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION import_inventory_counts(UUID, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION import_inventory_count_details(UUID, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION import_equipment_assignments(UUID, JSONB) TO service_role;
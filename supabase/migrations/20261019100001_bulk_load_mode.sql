@@ -0,0 +1,211 @@
+-- ==========================================================================
+-- Migration: 20261019100001_bulk_load_mode
+-- Purpose: Sanctioned bulk-load mode for the Excel importer.
+--
+-- While a bulk load is active for the current request, the shared per-row
+-- triggers (set_updated_at, set_version_etag, prevent_hard_delete,
+-- audit_status_change) return immediately. Instead of per-row audit rows,
+-- end_bulk_load() writes one BULK_IMPORT audit_events row per table with
+-- its row count.
+--
+-- A bulk load is active only for service-level callers:
+--   * a direct Postgres connection (not PostgREST's authenticator) that set
+--     gleamops.bulk_load = 'on', or
+--   * a PostgREST request with a service_role JWT whose X-Bulk-Load-Session
+--     header names an open, unexpired row in import_bulk_sessions.
+-- Normal app traffic (anon / authenticated) always gets the full triggers.
+--
+-- Rollback:
+--   Re-run the original definitions from 00003_shared_triggers.sql,
+--   00009_audit_helper.sql and 00050_prevent_hard_deletes.sql, then:
+--   DROP FUNCTION IF EXISTS end_bulk_load(UUID, JSONB);
+--   DROP FUNCTION IF EXISTS begin_bulk_load(UUID, TEXT, INTERVAL);
+--   DROP FUNCTION IF EXISTS bulk_load_active();
+--   DROP TABLE IF EXISTS public.import_bulk_sessions;
+-- ==========================================================================
+
+-- ---------------------------------------------------------------------------
+-- 1. Session registry
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS public.import_bulk_sessions (
+  id          UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  tenant_id   UUID NOT NULL REFERENCES public.tenants(id),
+  source      TEXT,
+  started_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  expires_at  TIMESTAMPTZ NOT NULL,
+  ended_at    TIMESTAMPTZ,
+  row_counts  JSONB
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_bulk_sessions_tenant
+  ON public.import_bulk_sessions(tenant_id, started_at DESC);
+
+ALTER TABLE public.import_bulk_sessions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY import_bulk_sessions_select ON public.import_bulk_sessions
+  FOR SELECT USING (
+    tenant_id = current_tenant_id()
+    AND has_any_role(auth.uid(), ARRAY['OWNER_ADMIN', 'MANAGER'])
+  );
+
+-- ---------------------------------------------------------------------------
+-- 2. bulk_load_active(): checked first thing by the shared triggers
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION bulk_load_active()
+RETURNS BOOLEAN
+LANGUAGE plpgsql STABLE SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_session TEXT;
+BEGIN
+  -- Direct loader connection (never the PostgREST authenticator)
+  IF current_setting('gleamops.bulk_load', true) = 'on' THEN
+    RETURN session_user <> 'authenticator';
+  END IF;
+
+  -- PostgREST request: service-role JWT plus an open session header
+  IF coalesce(nullif(current_setting('request.jwt.claims', true), '')::jsonb ->> 'role', '') <> 'service_role' THEN
+    RETURN false;
+  END IF;
+
+  v_session := nullif(current_setting('request.headers', true), '')::jsonb ->> 'x-bulk-load-session';
+  IF v_session IS NULL OR v_session !~ '^[0-9a-fA-F-]{36}$' THEN
+    RETURN false;
+  END IF;
+
+  RETURN EXISTS (
+    SELECT 1 FROM public.import_bulk_sessions
+    WHERE id = v_session::uuid
+      AND ended_at IS NULL
+      AND expires_at > now()
+  );
+END;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 3. Shared triggers: skip per-row work during a bulk load
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF bulk_load_active() THEN
+    RETURN NEW;
+  END IF;
+  NEW.updated_at = now();
+  RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION set_version_etag()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF bulk_load_active() THEN
+    RETURN NEW;
+  END IF;
+  NEW.version_etag = gen_random_uuid();
+  RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION prevent_hard_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF bulk_load_active() THEN
+    RETURN OLD;
+  END IF;
+  RAISE EXCEPTION 'Hard deletes are not allowed on table %. Use soft delete (UPDATE archived_at) instead.', TG_TABLE_NAME
+    USING ERRCODE = 'P0001';
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION audit_status_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER
+AS $$
+BEGIN
+  IF bulk_load_active() THEN
+    RETURN NEW;
+  END IF;
+
+  -- Only fire if status actually changed
+  IF OLD.status IS DISTINCT FROM NEW.status THEN
+    PERFORM write_audit_event(
+      NEW.tenant_id,
+      TG_TABLE_NAME,
+      NEW.id,
+      NULL,  -- entity_code filled by caller or NULL
+      'STATUS_CHANGE',
+      jsonb_build_object('status', OLD.status),
+      jsonb_build_object('status', NEW.status),
+      auth.uid()
+    );
+  END IF;
+
+  RETURN NEW;
+END;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- 4. Session RPCs (service role only)
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION begin_bulk_load(
+  p_tenant_id UUID,
+  p_source TEXT DEFAULT NULL,
+  p_ttl INTERVAL DEFAULT interval '2 hours'
+)
+RETURNS UUID
+LANGUAGE sql
+SET search_path = public
+AS $$
+  INSERT INTO import_bulk_sessions (tenant_id, source, expires_at)
+  VALUES (p_tenant_id, p_source, now() + p_ttl)
+  RETURNING id;
+$$;
+
+-- Close the session and write one set-based audit record per table.
+-- p_row_counts: {"<table>": <rows loaded>, ...}
+CREATE OR REPLACE FUNCTION end_bulk_load(p_session_id UUID, p_row_counts JSONB)
+RETURNS INT
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_written INT;
+BEGIN
+  INSERT INTO audit_events (
+    tenant_id, entity_type, action, after, actor_user_id, reason, request_path
+  )
+  SELECT
+    s.tenant_id,
+    c.key,
+    'BULK_IMPORT',
+    jsonb_build_object('rows', c.value, 'session_id', s.id, 'started_at', s.started_at),
+    '00000000-0000-0000-0000-000000000000'::uuid,
+    'Bulk load',
+    s.source
+  FROM import_bulk_sessions s
+  CROSS JOIN jsonb_each(COALESCE(p_row_counts, '{}'::jsonb)) c
+  WHERE s.id = p_session_id
+    AND s.ended_at IS NULL;
+  GET DIAGNOSTICS v_written = ROW_COUNT;
+
+  UPDATE import_bulk_sessions
+  SET ended_at = now(),
+      row_counts = p_row_counts
+  WHERE id = p_session_id
+    AND ended_at IS NULL;
+
+  RETURN v_written;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION begin_bulk_load(UUID, TEXT, INTERVAL) FROM PUBLIC;
+REVOKE ALL ON FUNCTION end_bulk_load(UUID, JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION begin_bulk_load(UUID, TEXT, INTERVAL) TO service_role;
+GRANT EXECUTE ON FUNCTION end_bulk_load(UUID, JSONB) TO service_role;
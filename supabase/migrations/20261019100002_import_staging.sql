@@ -0,0 +1,277 @@
+-- ==========================================================================
+-- Migration: 20261019100002_import_staging
+-- Purpose: Zero-downtime Excel import. The importer (IMPORT_STAGING=1)
+-- writes every row and follow-up update into import_staging_rows instead of
+-- the live tables; import_cutover() then replaces the tenant's live data in
+-- a single transaction:
+--
+--   1. delete the tenant's rows from p_delete_tables (children first)
+--   2. insert staged rows table by table in staging order (parents first),
+--      ON CONFLICT DO NOTHING, retrying row by row if the set insert fails
+--   3. apply staged patches (supervisor links, sequence values)
+--   4. validate: every staged table got rows, skipped rows <= p_max_skipped
+--
+-- Readers keep seeing the previous data until the transaction commits, so
+-- the app never observes an empty or half-imported tenant. If validation or
+-- any step fails, everything rolls back and the staged rows are kept for
+-- inspection; the function returns the per-table report either way.
+--
+-- The cutover runs with the bulk-load trigger shortcuts. It cannot set
+-- gleamops.bulk_load for that: bulk_load_active() ignores that setting on
+-- PostgREST connections (session_user authenticator), so a value leaking
+-- into one (role defaults, a pooled connection) cannot switch off the
+-- shared triggers for app traffic. Instead it calls
+-- bulk_load_this_transaction(), which only works when current_user owns it,
+-- i.e. from a SECURITY DEFINER function of the schema owner, and marks the
+-- current transaction only: gleamops.bulk_load_cache carries the
+-- transaction id, and bulk_load_active() ignores a mark from any other.
+--
+-- Rollback:
+--   DROP FUNCTION IF EXISTS import_cutover(UUID, UUID, TEXT[], INT);
+--   DROP FUNCTION IF EXISTS bulk_load_this_transaction();
+--   DROP TABLE IF EXISTS public.import_staging_rows;
+--   Re-run bulk_load_active() from 20261019100001_bulk_load_mode.sql.
+-- ==========================================================================
+
+-- ---------------------------------------------------------------------------
+-- 1. Staging rows (transient, so UNLOGGED)
+-- ---------------------------------------------------------------------------
+CREATE UNLOGGED TABLE IF NOT EXISTS public.import_staging_rows (
+  id          BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  run_id      UUID NOT NULL,
+  tenant_id   UUID NOT NULL REFERENCES public.tenants(id),
+  table_name  TEXT NOT NULL,
+  op          TEXT NOT NULL DEFAULT 'insert' CHECK (op IN ('insert', 'patch')),
+  match       JSONB,
+  data        JSONB NOT NULL,
+  created_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_staging_rows_run
+  ON public.import_staging_rows(run_id, table_name, id);
+
+ALTER TABLE public.import_staging_rows ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY import_staging_rows_select ON public.import_staging_rows
+  FOR SELECT USING (
+    tenant_id = current_tenant_id()
+    AND has_any_role(auth.uid(), ARRAY['OWNER_ADMIN'])
+  );
+
+-- ---------------------------------------------------------------------------
+-- 2. bulk_load_active(), bulk_load_this_transaction()
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION bulk_load_active()
+RETURNS BOOLEAN
+LANGUAGE plpgsql STABLE SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_session TEXT;
+BEGIN
+  -- Direct loader connection (never the PostgREST authenticator)
+  IF current_setting('gleamops.bulk_load', true) = 'on' THEN
+    RETURN session_user <> 'authenticator';
+  END IF;
+
+  -- Marked by bulk_load_this_transaction() in this transaction
+  IF current_setting('gleamops.bulk_load_cache', true) = 'on:' || txid_current()::text THEN
+    RETURN true;
+  END IF;
+
+  -- PostgREST request: service-role JWT plus an open session header
+  IF coalesce(nullif(current_setting('request.jwt.claims', true), '')::jsonb ->> 'role', '') <> 'service_role' THEN
+    RETURN false;
+  END IF;
+
+  v_session := nullif(current_setting('request.headers', true), '')::jsonb ->> 'x-bulk-load-session';
+  IF v_session IS NULL OR v_session !~ '^[0-9a-fA-F-]{36}$' THEN
+    RETURN false;
+  END IF;
+
+  RETURN EXISTS (
+    SELECT 1 FROM public.import_bulk_sessions
+    WHERE id = v_session::uuid
+      AND ended_at IS NULL
+      AND expires_at > now()
+  );
+END;
+$$;
+
+-- For the owner's SECURITY DEFINER functions (import_cutover, clone_tenant)
+CREATE OR REPLACE FUNCTION bulk_load_this_transaction()
+RETURNS VOID
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  IF current_user <> (SELECT pg_get_userbyid(proowner) FROM pg_proc
+                      WHERE oid = 'public.bulk_load_this_transaction()'::regprocedure) THEN
+    RAISE EXCEPTION 'bulk_load_this_transaction() may only run as its owner';
+  END IF;
+  PERFORM set_config('gleamops.bulk_load_cache', 'on:' || txid_current()::text, true);
+END;
+$$;
+
+REVOKE ALL ON FUNCTION bulk_load_this_transaction() FROM PUBLIC;
+
+-- ---------------------------------------------------------------------------
+-- 3. import_cutover()
+-- ---------------------------------------------------------------------------
+-- p_delete_tables: tables to clear for the tenant, children first (tables
+--   without a tenant_id column are left alone).
+-- p_max_skipped: abort if more staged rows than this are skipped (NULL = no
+--   limit). A staged table that would end up with no rows always aborts.
+-- Returns {"applied": bool, "error": text, "tables": [{table, staged,
+--   inserted, errors}, ...], "patches": {applied, failed}}.
+CREATE OR REPLACE FUNCTION import_cutover(
+  p_run_id UUID,
+  p_tenant_id UUID,
+  p_delete_tables TEXT[],
+  p_max_skipped INT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_table TEXT;
+  v_cols TEXT[];
+  v_col_list TEXT;
+  v_sel_list TEXT;
+  v_staged INT;
+  v_inserted INT;
+  v_n INT;
+  v_errors JSONB;
+  v_skipped INT := 0;
+  v_empty TEXT[] := '{}';
+  v_rec RECORD;
+  v_set TEXT;
+  v_where TEXT;
+  v_patched INT := 0;
+  v_patch_failed INT := 0;
+  v_tables JSONB := '[]'::jsonb;
+BEGIN
+  BEGIN
+    PERFORM bulk_load_this_transaction();
+
+    -- 1. Clear the tenant's live rows
+    FOREACH v_table IN ARRAY p_delete_tables LOOP
+      IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = v_table AND column_name = 'tenant_id'
+      ) THEN
+        EXECUTE format('DELETE FROM public.%I WHERE tenant_id = $1', v_table) USING p_tenant_id;
+      END IF;
+    END LOOP;
+
+    -- 2. Insert staged rows, in the order tables were staged
+    FOR v_table IN
+      SELECT table_name FROM import_staging_rows
+      WHERE run_id = p_run_id AND op = 'insert'
+      GROUP BY table_name
+      ORDER BY min(id)
+    LOOP
+      SELECT array_agg(c.column_name::text ORDER BY c.ordinal_position) INTO v_cols
+      FROM information_schema.columns c
+      WHERE c.table_schema = 'public' AND c.table_name = v_table
+        AND c.column_name IN (
+          SELECT DISTINCT k FROM import_staging_rows s, jsonb_object_keys(s.data) k
+          WHERE s.run_id = p_run_id AND s.table_name = v_table AND s.op = 'insert'
+        );
+      SELECT count(*) INTO v_staged FROM import_staging_rows
+      WHERE run_id = p_run_id AND table_name = v_table AND op = 'insert';
+
+      v_col_list := (SELECT string_agg(format('%I', c), ', ') FROM unnest(v_cols) c);
+      v_sel_list := (SELECT string_agg(format('r.%I', c), ', ') FROM unnest(v_cols) c);
+      v_errors := '[]'::jsonb;
+
+      BEGIN
+        EXECUTE format(
+          'INSERT INTO public.%I (%s) SELECT %s FROM import_staging_rows s, '
+          'jsonb_populate_record(NULL::public.%I, s.data) r '
+          'WHERE s.run_id = $1 AND s.table_name = $2 AND s.op = ''insert'' '
+          'ORDER BY s.id ON CONFLICT DO NOTHING',
+          v_table, v_col_list, v_sel_list, v_table)
+        USING p_run_id, v_table;
+        GET DIAGNOSTICS v_inserted = ROW_COUNT;
+      EXCEPTION WHEN OTHERS THEN
+        -- One bad row only skips itself
+        v_inserted := 0;
+        FOR v_rec IN
+          SELECT s.data FROM import_staging_rows s
+          WHERE s.run_id = p_run_id AND s.table_name = v_table AND s.op = 'insert'
+          ORDER BY s.id
+        LOOP
+          BEGIN
+            EXECUTE format(
+              'INSERT INTO public.%I (%s) SELECT %s FROM jsonb_populate_record(NULL::public.%I, $1) r '
+              'ON CONFLICT DO NOTHING',
+              v_table, v_col_list, v_sel_list, v_table)
+            USING v_rec.data;
+            GET DIAGNOSTICS v_n = ROW_COUNT;
+            v_inserted := v_inserted + v_n;
+          EXCEPTION WHEN OTHERS THEN
+            IF jsonb_array_length(v_errors) < 10 THEN
+              v_errors := v_errors || to_jsonb(left(SQLERRM, 200));
+            END IF;
+          END;
+        END LOOP;
+      END;
+
+      v_skipped := v_skipped + (v_staged - v_inserted);
+      IF v_inserted = 0 THEN
+        v_empty := v_empty || v_table;
+      END IF;
+      v_tables := v_tables || jsonb_build_object(
+        'table', v_table, 'staged', v_staged, 'inserted', v_inserted, 'errors', v_errors);
+    END LOOP;
+
+    -- 3. Staged updates
+    FOR v_rec IN
+      SELECT table_name, match, data FROM import_staging_rows
+      WHERE run_id = p_run_id AND op = 'patch'
+      ORDER BY id
+    LOOP
+      v_set := (SELECT string_agg(format('%I = r.%I', k, k), ', ') FROM jsonb_object_keys(v_rec.data) k);
+      v_where := (SELECT string_agg(format('t.%I = m.%I', k, k), ' AND ') FROM jsonb_object_keys(v_rec.match) k);
+      BEGIN
+        EXECUTE format(
+          'UPDATE public.%I t SET %s FROM jsonb_populate_record(NULL::public.%I, $1) r, '
+          'jsonb_populate_record(NULL::public.%I, $2) m WHERE %s',
+          v_rec.table_name, v_set, v_rec.table_name, v_rec.table_name, v_where)
+        USING v_rec.data, v_rec.match;
+        v_patched := v_patched + 1;
+      EXCEPTION WHEN OTHERS THEN
+        v_patch_failed := v_patch_failed + 1;
+      END;
+    END LOOP;
+
+    -- 4. Validate before committing
+    IF array_length(v_empty, 1) > 0 THEN
+      RAISE EXCEPTION 'no rows would remain in: %', array_to_string(v_empty, ', ');
+    END IF;
+    IF p_max_skipped IS NOT NULL AND v_skipped > p_max_skipped THEN
+      RAISE EXCEPTION '% staged rows skipped (limit %)', v_skipped, p_max_skipped;
+    END IF;
+  EXCEPTION WHEN OTHERS THEN
+    RETURN jsonb_build_object(
+      'applied', false,
+      'error', SQLERRM,
+      'tables', v_tables,
+      'patches', jsonb_build_object('applied', v_patched, 'failed', v_patch_failed));
+  END;
+
+  DELETE FROM import_staging_rows WHERE run_id = p_run_id;
+
+  RETURN jsonb_build_object(
+    'applied', true,
+    'error', NULL,
+    'tables', v_tables,
+    'patches', jsonb_build_object('applied', v_patched, 'failed', v_patch_failed));
+END;
+$$;
+
+REVOKE ALL ON FUNCTION import_cutover(UUID, UUID, TEXT[], INT) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION import_cutover(UUID, UUID, TEXT[], INT) TO service_role;
@@ -0,0 +1,184 @@
+-- ==========================================================================
+-- Migration: 20261019100003_clone_tenant
+-- Purpose: Server-side tenant clone for demo and staging copies. The
+-- importer (--clone SOURCE_TENANT_ID) calls clone_tenant() once; it copies
+-- an already-imported tenant's tables into another tenant with one
+-- INSERT ... SELECT per table, in a single transaction:
+--
+--   1. create the target tenant from the source's settings if it is new
+--   2. delete the target's rows from p_delete_tables (children first)
+--   3. give every source row of p_tables a new id (clone_tenant_ids)
+--   4. copy p_tables in order (parents first), rewriting per column:
+--        id, tenant_id                 → new id, target tenant
+--        FK to a cloned table          → that row's new id
+--        FK to another tenant's table  → NULL (nothing to point at)
+--        globally unique *code column  → code || p_code_suffix
+--        other globally unique column  → NULL (user_id, public tokens)
+--   5. carry system_sequences over, never lowering the target's values
+--
+-- Columns are read from the catalog, so tables gain columns without this
+-- function changing. Any error rolls everything back; the function returns
+-- the per-table report either way.
+--
+-- Rollback:
+--   DROP FUNCTION IF EXISTS clone_tenant(UUID, UUID, TEXT[], TEXT[], TEXT);
+-- ==========================================================================
+
+-- p_code_suffix: appended to codes that are unique across tenants (default
+--   '-' || the target's tenant_code, e.g. CLI-1001-TNT-0004).
+-- Returns {"applied": bool, "error": text, "tenant_created": bool,
+--   "code_suffix": text, "tables": [{table, rows}, ...]}.
+CREATE OR REPLACE FUNCTION clone_tenant(
+  p_source_tenant_id UUID,
+  p_target_tenant_id UUID,
+  p_tables TEXT[],
+  p_delete_tables TEXT[],
+  p_code_suffix TEXT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_table TEXT;
+  v_suffix TEXT := p_code_suffix;
+  v_created BOOLEAN := false;
+  v_col RECORD;
+  v_cols TEXT[];
+  v_sels TEXT[];
+  v_joins TEXT;
+  v_n INT;
+  v_tables JSONB := '[]'::jsonb;
+BEGIN
+  BEGIN
+    IF p_source_tenant_id = p_target_tenant_id THEN
+      RAISE EXCEPTION 'source and target tenant are the same';
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM tenants WHERE id = p_source_tenant_id) THEN
+      RAISE EXCEPTION 'tenant % not found', p_source_tenant_id;
+    END IF;
+    PERFORM bulk_load_this_transaction();
+
+    -- 1. Target tenant
+    IF NOT EXISTS (SELECT 1 FROM tenants WHERE id = p_target_tenant_id) THEN
+      INSERT INTO tenants
+      SELECT (jsonb_populate_record(NULL::tenants, to_jsonb(t) || jsonb_build_object(
+        'id', p_target_tenant_id,
+        'tenant_code', 'TNT-' || lpad((SELECT max(substring(tenant_code FROM 5)::bigint) + 1 FROM tenants)::text, 4, '0'),
+        'name', t.name || ' (copy)',
+        'created_at', now(),
+        'updated_at', now()))).*
+      FROM tenants t WHERE t.id = p_source_tenant_id;
+      v_created := true;
+    END IF;
+    IF v_suffix IS NULL THEN
+      SELECT '-' || tenant_code INTO v_suffix FROM tenants WHERE id = p_target_tenant_id;
+    END IF;
+
+    -- 2. Clear the target's rows
+    FOREACH v_table IN ARRAY p_delete_tables LOOP
+      IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = v_table AND column_name = 'tenant_id'
+      ) THEN
+        EXECUTE format('DELETE FROM public.%I WHERE tenant_id = $1', v_table) USING p_target_tenant_id;
+      END IF;
+    END LOOP;
+
+    -- 3. New ids for every row up front, so self-references resolve too
+    CREATE TEMP TABLE IF NOT EXISTS clone_tenant_ids (
+      old_id UUID PRIMARY KEY,
+      new_id UUID NOT NULL
+    ) ON COMMIT DROP;
+    TRUNCATE clone_tenant_ids;
+    FOREACH v_table IN ARRAY p_tables LOOP
+      EXECUTE format('INSERT INTO clone_tenant_ids SELECT id, gen_random_uuid() FROM public.%I WHERE tenant_id = $1',
+                     v_table) USING p_source_tenant_id;
+    END LOOP;
+    ANALYZE clone_tenant_ids;
+
+    -- 4. Copy each table
+    FOREACH v_table IN ARRAY p_tables LOOP
+      v_cols := '{}';
+      v_sels := '{}';
+      v_joins := '';
+      FOR v_col IN
+        SELECT a.attname::text AS name,
+               a.atttypid IN ('text'::regtype, 'varchar'::regtype) AS is_text,
+               f.confrelid::regclass::text AS ref,
+               EXISTS (SELECT 1 FROM pg_attribute r
+                       WHERE r.attrelid = f.confrelid AND r.attname = 'tenant_id' AND NOT r.attisdropped)
+                 AND f.confrelid <> 'tenants'::regclass AS ref_scoped,
+               EXISTS (SELECT 1 FROM pg_index i
+                       WHERE i.indrelid = a.attrelid AND i.indisunique AND NOT i.indisprimary
+                         AND a.attnum = ANY(i.indkey)
+                         AND NOT EXISTS (SELECT 1 FROM pg_attribute t
+                                         WHERE t.attrelid = a.attrelid AND t.attname = 'tenant_id'
+                                           AND t.attnum = ANY(i.indkey))) AS global_unique
+        FROM pg_attribute a
+        LEFT JOIN LATERAL (
+          SELECT c.confrelid FROM pg_constraint c
+          WHERE c.conrelid = a.attrelid AND c.contype = 'f' AND c.conkey = ARRAY[a.attnum]
+          LIMIT 1
+        ) f ON true
+        WHERE a.attrelid = format('public.%I', v_table)::regclass
+          AND a.attnum > 0 AND NOT a.attisdropped
+          AND a.attgenerated = '' AND a.attidentity <> 'a'
+        ORDER BY a.attnum
+      LOOP
+        v_cols := v_cols || format('%I', v_col.name);
+        IF v_col.name = 'id' THEN
+          v_sels := v_sels || 'm.new_id'::text;
+        ELSIF v_col.name = 'tenant_id' THEN
+          v_sels := v_sels || format('%L::uuid', p_target_tenant_id);
+        ELSIF v_col.ref = ANY(p_tables) THEN
+          v_joins := v_joins || format(' LEFT JOIN clone_tenant_ids m%s ON m%s.old_id = s.%I',
+                                       cardinality(v_cols), cardinality(v_cols), v_col.name);
+          v_sels := v_sels || format('m%s.new_id', cardinality(v_cols));
+        ELSIF v_col.ref_scoped THEN
+          v_sels := v_sels || 'NULL'::text;
+        ELSIF v_col.global_unique AND v_col.is_text AND v_col.name LIKE '%code' THEN
+          v_sels := v_sels || format('s.%I || %L', v_col.name, v_suffix);
+        ELSIF v_col.global_unique THEN
+          v_sels := v_sels || 'NULL'::text;
+        ELSE
+          v_sels := v_sels || format('s.%I', v_col.name);
+        END IF;
+      END LOOP;
+
+      EXECUTE format(
+        'INSERT INTO public.%I (%s) SELECT %s FROM public.%I s '
+        'JOIN clone_tenant_ids m ON m.old_id = s.id%s WHERE s.tenant_id = $1',
+        v_table, array_to_string(v_cols, ', '), array_to_string(v_sels, ', '), v_table, v_joins)
+      USING p_source_tenant_id;
+      GET DIAGNOSTICS v_n = ROW_COUNT;
+      v_tables := v_tables || jsonb_build_object('table', v_table, 'rows', v_n);
+    END LOOP;
+
+    -- 5. Sequences
+    INSERT INTO system_sequences (tenant_id, prefix, current_value)
+    SELECT p_target_tenant_id, prefix, current_value
+    FROM system_sequences WHERE tenant_id = p_source_tenant_id
+    ON CONFLICT (tenant_id, prefix)
+    DO UPDATE SET current_value = GREATEST(system_sequences.current_value, EXCLUDED.current_value);
+  EXCEPTION WHEN OTHERS THEN
+    RETURN jsonb_build_object(
+      'applied', false,
+      'error', SQLERRM,
+      'tenant_created', false,
+      'code_suffix', v_suffix,
+      'tables', v_tables);
+  END;
+
+  RETURN jsonb_build_object(
+    'applied', true,
+    'error', NULL,
+    'tenant_created', v_created,
+    'code_suffix', v_suffix,
+    'tables', v_tables);
+END;
+$$;
+
+REVOKE ALL ON FUNCTION clone_tenant(UUID, UUID, TEXT[], TEXT[], TEXT) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION clone_tenant(UUID, UUID, TEXT[], TEXT[], TEXT) TO service_role;
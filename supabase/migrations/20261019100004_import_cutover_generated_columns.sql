@@ -0,0 +1,164 @@
+-- ==========================================================================
+-- Migration: 20261019100004_import_cutover_generated_columns
+-- Purpose: import_cutover() skips generated and identity-always columns.
+-- Rows staged from a snapshot (--rollback with IMPORT_STAGING=1) carry
+-- every column the REST API returned, including computed ones such as
+-- clients.normalized_name; inserting a value into those fails the whole
+-- table. They are now left for the database to compute.
+--
+-- Rollback:
+--   Re-run import_cutover() from 20261019100002_import_staging.sql.
+-- ==========================================================================
+
+CREATE OR REPLACE FUNCTION import_cutover(
+  p_run_id UUID,
+  p_tenant_id UUID,
+  p_delete_tables TEXT[],
+  p_max_skipped INT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_table TEXT;
+  v_cols TEXT[];
+  v_col_list TEXT;
+  v_sel_list TEXT;
+  v_staged INT;
+  v_inserted INT;
+  v_n INT;
+  v_errors JSONB;
+  v_skipped INT := 0;
+  v_empty TEXT[] := '{}';
+  v_rec RECORD;
+  v_set TEXT;
+  v_where TEXT;
+  v_patched INT := 0;
+  v_patch_failed INT := 0;
+  v_tables JSONB := '[]'::jsonb;
+BEGIN
+  BEGIN
+    PERFORM bulk_load_this_transaction();
+
+    -- 1. Clear the tenant's live rows
+    FOREACH v_table IN ARRAY p_delete_tables LOOP
+      IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = v_table AND column_name = 'tenant_id'
+      ) THEN
+        EXECUTE format('DELETE FROM public.%I WHERE tenant_id = $1', v_table) USING p_tenant_id;
+      END IF;
+    END LOOP;
+
+    -- 2. Insert staged rows, in the order tables were staged
+    FOR v_table IN
+      SELECT table_name FROM import_staging_rows
+      WHERE run_id = p_run_id AND op = 'insert'
+      GROUP BY table_name
+      ORDER BY min(id)
+    LOOP
+      SELECT array_agg(c.column_name::text ORDER BY c.ordinal_position) INTO v_cols
+      FROM information_schema.columns c
+      WHERE c.table_schema = 'public' AND c.table_name = v_table
+        AND c.is_generated = 'NEVER' AND c.identity_generation IS DISTINCT FROM 'ALWAYS'
+        AND c.column_name IN (
+          SELECT DISTINCT k FROM import_staging_rows s, jsonb_object_keys(s.data) k
+          WHERE s.run_id = p_run_id AND s.table_name = v_table AND s.op = 'insert'
+        );
+      SELECT count(*) INTO v_staged FROM import_staging_rows
+      WHERE run_id = p_run_id AND table_name = v_table AND op = 'insert';
+
+      v_col_list := (SELECT string_agg(format('%I', c), ', ') FROM unnest(v_cols) c);
+      v_sel_list := (SELECT string_agg(format('r.%I', c), ', ') FROM unnest(v_cols) c);
+      v_errors := '[]'::jsonb;
+
+      BEGIN
+        EXECUTE format(
+          'INSERT INTO public.%I (%s) SELECT %s FROM import_staging_rows s, '
+          'jsonb_populate_record(NULL::public.%I, s.data) r '
+          'WHERE s.run_id = $1 AND s.table_name = $2 AND s.op = ''insert'' '
+          'ORDER BY s.id ON CONFLICT DO NOTHING',
+          v_table, v_col_list, v_sel_list, v_table)
+        USING p_run_id, v_table;
+        GET DIAGNOSTICS v_inserted = ROW_COUNT;
+      EXCEPTION WHEN OTHERS THEN
+        -- One bad row only skips itself
+        v_inserted := 0;
+        FOR v_rec IN
+          SELECT s.data FROM import_staging_rows s
+          WHERE s.run_id = p_run_id AND s.table_name = v_table AND s.op = 'insert'
+          ORDER BY s.id
+        LOOP
+          BEGIN
+            EXECUTE format(
+              'INSERT INTO public.%I (%s) SELECT %s FROM jsonb_populate_record(NULL::public.%I, $1) r '
+              'ON CONFLICT DO NOTHING',
+              v_table, v_col_list, v_sel_list, v_table)
+            USING v_rec.data;
+            GET DIAGNOSTICS v_n = ROW_COUNT;
+            v_inserted := v_inserted + v_n;
+          EXCEPTION WHEN OTHERS THEN
+            IF jsonb_array_length(v_errors) < 10 THEN
+              v_errors := v_errors || to_jsonb(left(SQLERRM, 200));
+            END IF;
+          END;
+        END LOOP;
+      END;
+
+      v_skipped := v_skipped + (v_staged - v_inserted);
+      IF v_inserted = 0 THEN
+        v_empty := v_empty || v_table;
+      END IF;
+      v_tables := v_tables || jsonb_build_object(
+        'table', v_table, 'staged', v_staged, 'inserted', v_inserted, 'errors', v_errors);
+    END LOOP;
+
+    -- 3. Staged updates
+    FOR v_rec IN
+      SELECT table_name, match, data FROM import_staging_rows
+      WHERE run_id = p_run_id AND op = 'patch'
+      ORDER BY id
+    LOOP
+      v_set := (SELECT string_agg(format('%I = r.%I', k, k), ', ') FROM jsonb_object_keys(v_rec.data) k);
+      v_where := (SELECT string_agg(format('t.%I = m.%I', k, k), ' AND ') FROM jsonb_object_keys(v_rec.match) k);
+      BEGIN
+        EXECUTE format(
+          'UPDATE public.%I t SET %s FROM jsonb_populate_record(NULL::public.%I, $1) r, '
+          'jsonb_populate_record(NULL::public.%I, $2) m WHERE %s',
+          v_rec.table_name, v_set, v_rec.table_name, v_rec.table_name, v_where)
+        USING v_rec.data, v_rec.match;
+        v_patched := v_patched + 1;
+      EXCEPTION WHEN OTHERS THEN
+        v_patch_failed := v_patch_failed + 1;
+      END;
+    END LOOP;
+
+    -- 4. Validate before committing
+    IF array_length(v_empty, 1) > 0 THEN
+      RAISE EXCEPTION 'no rows would remain in: %', array_to_string(v_empty, ', ');
+    END IF;
+    IF p_max_skipped IS NOT NULL AND v_skipped > p_max_skipped THEN
+      RAISE EXCEPTION '% staged rows skipped (limit %)', v_skipped, p_max_skipped;
+    END IF;
+  EXCEPTION WHEN OTHERS THEN
+    RETURN jsonb_build_object(
+      'applied', false,
+      'error', SQLERRM,
+      'tables', v_tables,
+      'patches', jsonb_build_object('applied', v_patched, 'failed', v_patch_failed));
+  END;
+
+  DELETE FROM import_staging_rows WHERE run_id = p_run_id;
+
+  RETURN jsonb_build_object(
+    'applied', true,
+    'error', NULL,
+    'tables', v_tables,
+    'patches', jsonb_build_object('applied', v_patched, 'failed', v_patch_failed));
+END;
+$$;
+
+REVOKE ALL ON FUNCTION import_cutover(UUID, UUID, TEXT[], INT) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION import_cutover(UUID, UUID, TEXT[], INT) TO service_role;
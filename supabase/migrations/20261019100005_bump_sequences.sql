@@ -0,0 +1,32 @@
+-- ==========================================================================
+-- Migration: 20261019100005_bump_sequences
+-- Purpose: Set-based, never-decreasing system_sequences update for the
+-- Excel importer. The importer tracks the highest number it loaded per code
+-- prefix (CLI-1234 → CLI: 1234) and sends them all in one call. Each
+-- sequence moves to GREATEST(current, imported), so codes the app issued
+-- through next_code() while the import ran are never handed out again.
+--
+-- Rollback:
+--   DROP FUNCTION IF EXISTS bump_sequences(UUID, JSONB);
+-- ==========================================================================
+
+-- p_values: {"<prefix>": <highest number imported>, ...}
+-- Returns {"<prefix>": <current_value after the update>, ...}.
+CREATE OR REPLACE FUNCTION bump_sequences(p_tenant_id UUID, p_values JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH bumped AS (
+    INSERT INTO system_sequences (tenant_id, prefix, current_value)
+    SELECT p_tenant_id, v.key, v.value::bigint
+    FROM jsonb_each_text(COALESCE(p_values, '{}'::jsonb)) v
+    ON CONFLICT (tenant_id, prefix)
+    DO UPDATE SET current_value = GREATEST(system_sequences.current_value, EXCLUDED.current_value)
+    RETURNING prefix, current_value
+  )
+  SELECT COALESCE(jsonb_object_agg(prefix, current_value), '{}'::jsonb) FROM bumped;
+$$;
+
+REVOKE ALL ON FUNCTION bump_sequences(UUID, JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION bump_sequences(UUID, JSONB) TO service_role;
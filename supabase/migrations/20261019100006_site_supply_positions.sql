@@ -0,0 +1,32 @@
+-- ==========================================================================
+-- Migration: 20261019100006_site_supply_positions
+-- Purpose: Precomputed inventory positions. The Excel importer rolls up, per
+-- site and supply, the quantity from the latest inventory count that
+-- includes it and loads the result here with the rest of the import, so
+-- pages read one row per site/supply instead of scanning inventory_counts
+-- and inventory_count_details on every load. Rows are derived and are
+-- replaced on each import.
+--
+-- Rollback:
+--   DROP TABLE IF EXISTS public.site_supply_positions;
+-- ==========================================================================
+
+CREATE TABLE IF NOT EXISTS public.site_supply_positions (
+  id          UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  tenant_id   UUID NOT NULL REFERENCES public.tenants(id),
+  site_id     UUID NOT NULL REFERENCES public.sites(id),
+  supply_id   UUID NOT NULL REFERENCES public.supply_catalog(id),
+  quantity    NUMERIC(10,2),
+  count_id    UUID REFERENCES public.inventory_counts(id),
+  counted_on  DATE,
+  computed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  UNIQUE (site_id, supply_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_site_supply_positions_tenant_site
+  ON public.site_supply_positions(tenant_id, site_id);
+
+ALTER TABLE public.site_supply_positions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY site_supply_positions_select ON public.site_supply_positions
+  FOR SELECT USING (tenant_id = current_tenant_id());
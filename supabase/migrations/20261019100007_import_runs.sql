@@ -0,0 +1,96 @@
+-- ==========================================================================
+-- Migration: 20261019100007_import_runs
+-- Purpose: Live progress of Excel imports for the app. Each importer run
+-- (cron, worker or CLI) keeps one import_runs row up to date: the stage it
+-- is in, that stage's rows done / total, tables done, rows loaded, errors
+-- (rows skipped) so far, current throughput and ETA. The importer sends its
+-- latest state through import_run_progress() at most every few seconds, so
+-- the row lags the run by that much at most.
+--
+-- Rollback:
+--   DROP FUNCTION IF EXISTS import_run_progress(UUID, UUID, JSONB);
+--   DROP TABLE IF EXISTS public.import_runs;
+-- ==========================================================================
+
+-- ---------------------------------------------------------------------------
+-- 1. Runs
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS public.import_runs (
+  id                UUID PRIMARY KEY,
+  tenant_id         UUID NOT NULL REFERENCES public.tenants(id),
+  source            TEXT,
+  status            TEXT NOT NULL DEFAULT 'RUNNING'
+                    CHECK (status IN ('RUNNING', 'COMPLETED', 'FAILED')),
+  stage             TEXT,
+  stage_rows_done   BIGINT NOT NULL DEFAULT 0,
+  stage_rows_total  BIGINT NOT NULL DEFAULT 0,
+  tables_done       INT NOT NULL DEFAULT 0,
+  tables_total      INT NOT NULL DEFAULT 0,
+  rows_done         BIGINT NOT NULL DEFAULT 0,
+  errors            BIGINT NOT NULL DEFAULT 0,
+  rows_per_sec      NUMERIC(12,1),
+  eta_seconds       INT,
+  message           TEXT,
+  started_at        TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at        TIMESTAMPTZ NOT NULL DEFAULT now(),
+  finished_at       TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_runs_tenant
+  ON public.import_runs(tenant_id, started_at DESC);
+
+ALTER TABLE public.import_runs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY import_runs_select ON public.import_runs
+  FOR SELECT USING (
+    tenant_id = current_tenant_id()
+    AND has_any_role(auth.uid(), ARRAY['OWNER_ADMIN', 'MANAGER'])
+  );
+
+-- ---------------------------------------------------------------------------
+-- 2. import_run_progress(): upsert a run's latest state (service role only)
+-- ---------------------------------------------------------------------------
+-- p_state: {"status", "source", "stage", "stage_rows_done", ...}; columns
+-- missing from it keep their defaults. finished_at is set once the status
+-- leaves RUNNING. Returns false if p_run_id belongs to another tenant.
+CREATE OR REPLACE FUNCTION import_run_progress(p_run_id UUID, p_tenant_id UUID, p_state JSONB)
+RETURNS BOOLEAN
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH written AS (
+    INSERT INTO import_runs AS r (
+      id, tenant_id, source, status, stage, stage_rows_done, stage_rows_total,
+      tables_done, tables_total, rows_done, errors, rows_per_sec, eta_seconds,
+      message, finished_at
+    )
+    SELECT
+      p_run_id, p_tenant_id, s.source, COALESCE(s.status, 'RUNNING'), s.stage,
+      COALESCE(s.stage_rows_done, 0), COALESCE(s.stage_rows_total, 0),
+      COALESCE(s.tables_done, 0), COALESCE(s.tables_total, 0),
+      COALESCE(s.rows_done, 0), COALESCE(s.errors, 0), s.rows_per_sec, s.eta_seconds,
+      s.message, CASE WHEN COALESCE(s.status, 'RUNNING') <> 'RUNNING' THEN now() END
+    FROM jsonb_populate_record(NULL::import_runs, p_state) s
+    ON CONFLICT (id) DO UPDATE SET
+      source = EXCLUDED.source,
+      status = EXCLUDED.status,
+      stage = EXCLUDED.stage,
+      stage_rows_done = EXCLUDED.stage_rows_done,
+      stage_rows_total = EXCLUDED.stage_rows_total,
+      tables_done = EXCLUDED.tables_done,
+      tables_total = EXCLUDED.tables_total,
+      rows_done = EXCLUDED.rows_done,
+      errors = EXCLUDED.errors,
+      rows_per_sec = EXCLUDED.rows_per_sec,
+      eta_seconds = EXCLUDED.eta_seconds,
+      message = EXCLUDED.message,
+      updated_at = now(),
+      finished_at = EXCLUDED.finished_at
+    WHERE r.tenant_id = EXCLUDED.tenant_id
+    RETURNING 1
+  )
+  SELECT EXISTS (SELECT 1 FROM written);
+$$;
+
+REVOKE ALL ON FUNCTION import_run_progress(UUID, UUID, JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION import_run_progress(UUID, UUID, JSONB) TO service_role;
@@ -0,0 +1,32 @@
+-- ==========================================================================
+-- Migration: 20261019100008_import_generated_columns
+-- Purpose: Tell the Excel importer which columns the database computes
+-- itself. PostgREST's OpenAPI description lists generated columns like any
+-- other, so over REST the importer reads them from here (copy mode reads
+-- information_schema directly) and never sends values for them, e.g. when
+-- restoring a snapshot that includes clients.normalized_name.
+--
+-- Rollback:
+--   DROP FUNCTION IF EXISTS import_generated_columns();
+-- ==========================================================================
+
+-- {"table": ["column", ...]} for generated and identity-always columns of
+-- the public schema.
+CREATE OR REPLACE FUNCTION import_generated_columns()
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT COALESCE(jsonb_object_agg(table_name, columns), '{}'::jsonb)
+  FROM (
+    SELECT c.table_name, jsonb_agg(c.column_name ORDER BY c.ordinal_position) AS columns
+    FROM information_schema.columns c
+    WHERE c.table_schema = 'public'
+      AND (c.is_generated = 'ALWAYS' OR c.identity_generation = 'ALWAYS')
+    GROUP BY c.table_name
+  ) g;
+$$;
+
+REVOKE ALL ON FUNCTION import_generated_columns() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION import_generated_columns() TO service_role;
@@ -0,0 +1,62 @@
+-- ==========================================================================
+-- Migration: 20261019100009_bulk_load_active_cache
+-- Purpose: Decide bulk-load mode once per transaction. The shared triggers
+-- call bulk_load_active() for every row they fire on; for a PostgREST
+-- request it parsed the JWT claims and request headers and looked the
+-- session up in import_bulk_sessions each time. The first call in a
+-- transaction now stores its answer in gleamops.bulk_load_cache
+-- ('on:<txid>' / 'off:<txid>', transaction-local) and later calls read only
+-- that, so a batch of N rows pays for one lookup instead of N. Normal app
+-- traffic caches 'off' the same way. A cached answer from another
+-- transaction is ignored, as is the 'on:<txid>' mark only
+-- bulk_load_this_transaction() (20261019100002) may set.
+--
+-- gleamops.bulk_load = 'on' is still checked first, and still only on
+-- direct loader connections (session_user is not the PostgREST
+-- authenticator).
+--
+-- Rollback:
+--   Re-run bulk_load_active() from 20261019100002_import_staging.sql.
+-- ==========================================================================
+
+CREATE OR REPLACE FUNCTION bulk_load_active()
+RETURNS BOOLEAN
+LANGUAGE plpgsql VOLATILE SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_xact TEXT;
+  v_session TEXT;
+  v_active BOOLEAN := false;
+BEGIN
+  -- Direct loader connection (never the PostgREST authenticator)
+  IF current_setting('gleamops.bulk_load', true) = 'on' THEN
+    RETURN session_user <> 'authenticator';
+  END IF;
+
+  -- Already decided in this transaction
+  v_xact := txid_current()::text;
+  CASE current_setting('gleamops.bulk_load_cache', true)
+    WHEN 'on:' || v_xact THEN RETURN true;
+    WHEN 'off:' || v_xact THEN RETURN false;
+    ELSE NULL;
+  END CASE;
+
+  -- PostgREST request: service-role JWT plus an open session header
+  IF coalesce(nullif(current_setting('request.jwt.claims', true), '')::jsonb ->> 'role', '') = 'service_role' THEN
+    v_session := nullif(current_setting('request.headers', true), '')::jsonb ->> 'x-bulk-load-session';
+    IF v_session ~ '^[0-9a-fA-F-]{36}$' THEN
+      v_active := EXISTS (
+        SELECT 1 FROM public.import_bulk_sessions
+        WHERE id = v_session::uuid
+          AND ended_at IS NULL
+          AND expires_at > now()
+      );
+    END IF;
+  END IF;
+
+  PERFORM set_config('gleamops.bulk_load_cache',
+                     CASE WHEN v_active THEN 'on:' ELSE 'off:' END || v_xact, true);
+  RETURN v_active;
+END;
+$$;
@@ -0,0 +1,210 @@
+-- ==========================================================================
+-- Migration: 20261019100011_import_rpcs_catalog_columns
+-- Purpose: The import_* functions (20261019100000_bulk_import_rpcs.sql) read
+-- each sheet with a hand-written jsonb_to_recordset(...) column list, so a
+-- column added to a table but not to its function was dropped without a
+-- word. They now share import_code_keyed(), which takes its column list from
+-- the catalog, fills rows with jsonb_populate_record(NULL::<table>, ...),
+-- and refuses rows carrying keys that are neither a column of the table nor
+-- one of the business codes it resolves.
+--
+-- p_refs lists the codes to resolve, one object per FK column:
+--   {"column": "client_id", "code": "client_code", "table": "clients",
+--    "key": "client_code", "required": true}
+-- Each code is looked up in <table>.<key> among the tenant's rows. Rows whose
+-- required codes are not found are skipped and reported in "unresolved",
+-- labelled with those codes ("JOB-1/TSK-9"); optional codes that are not
+-- found leave the column NULL. Staff codes are sent without their -A/-B
+-- suffix. The return value gains the ids of the skipped rows, so the caller
+-- can leave them out of its verification:
+--   { "inserted": <rows inserted>, "unresolved": [<labels>],
+--     "unresolved_ids": [<row ids>] }
+--
+-- Rollback:
+--   Re-run 20261019100000_bulk_import_rpcs.sql, then
+--   DROP FUNCTION IF EXISTS import_code_keyed(UUID, TEXT, JSONB, JSONB);
+-- ==========================================================================
+
+-- ---------------------------------------------------------------------------
+-- 1. import_code_keyed(): resolve codes and insert one sheet into p_table
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_code_keyed(
+  p_tenant_id UUID, p_table TEXT, p_refs JSONB, p_rows JSONB
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_columns TEXT[];
+  v_unknown TEXT[];
+  v_target TEXT;
+  v_values TEXT;
+  v_joins TEXT := '';
+  v_resolved TEXT := '';
+  v_required TEXT := 'true';
+  v_labels TEXT[] := '{}';
+  v_result JSONB;
+  v_ref JSONB;
+  i INT := 0;
+BEGIN
+  -- Columns a row may set: everything but generated and identity ALWAYS columns
+  SELECT array_agg(c.column_name::text ORDER BY c.ordinal_position) INTO v_columns
+  FROM information_schema.columns c
+  WHERE c.table_schema = 'public' AND c.table_name = p_table
+    AND c.is_generated = 'NEVER' AND c.identity_generation IS DISTINCT FROM 'ALWAYS';
+  IF v_columns IS NULL THEN
+    RAISE EXCEPTION 'import_code_keyed: unknown table %', p_table;
+  END IF;
+
+  SELECT array_agg(DISTINCT k.key ORDER BY k.key) INTO v_unknown
+  FROM jsonb_array_elements(p_rows) AS s(data), jsonb_object_keys(s.data) AS k(key)
+  WHERE k.key <> ALL (v_columns)
+    AND k.key NOT IN (SELECT r->>'code' FROM jsonb_array_elements(p_refs) AS r);
+  IF v_unknown IS NOT NULL THEN
+    RAISE EXCEPTION 'import_code_keyed: % has no column(s) %', p_table, array_to_string(v_unknown, ', ');
+  END IF;
+
+  FOR v_ref IN SELECT r FROM jsonb_array_elements(p_refs) AS r LOOP
+    i := i + 1;
+    v_joins := v_joins || format(
+      ' LEFT JOIN public.%I p%s ON p%s.tenant_id = $1 AND p%s.%I = s.data->>%L',
+      v_ref->>'table', i, i, i, v_ref->>'key', v_ref->>'code');
+    v_resolved := v_resolved || format(' || jsonb_build_object(%L, p%s.id)', v_ref->>'column', i);
+    IF COALESCE((v_ref->>'required')::boolean, false) THEN
+      v_required := v_required || format(' AND p%s.id IS NOT NULL', i);
+      v_labels := v_labels || format('COALESCE(s.data->>%L, %L)', v_ref->>'code', '?');
+    END IF;
+  END LOOP;
+
+  -- Insert the columns the sheet sets; the rest keep their defaults
+  SELECT string_agg(format('%I', c), ', '), string_agg(format('r.%I', c), ', ')
+  INTO v_target, v_values
+  FROM unnest(v_columns) AS c
+  WHERE c = 'tenant_id'
+     OR c IN (SELECT r->>'column' FROM jsonb_array_elements(p_refs) AS r)
+     OR EXISTS (SELECT 1 FROM jsonb_array_elements(p_rows) AS s(data) WHERE s.data ? c);
+
+  EXECUTE format($q$
+    WITH src AS (
+      SELECT %s AS ok, %s AS label,
+             s.data || jsonb_build_object('tenant_id', $1)%s AS data
+      FROM jsonb_array_elements($2) AS s(data)%s
+    ), ins AS (
+      INSERT INTO public.%I (%s)
+      SELECT %s
+      FROM src, jsonb_populate_record(NULL::public.%I, src.data) AS r
+      WHERE src.ok
+      ON CONFLICT DO NOTHING
+      RETURNING 1
+    )
+    SELECT jsonb_build_object(
+      'inserted', (SELECT count(*) FROM ins),
+      'unresolved', COALESCE((SELECT jsonb_agg(label) FROM src WHERE NOT ok), '[]'::jsonb),
+      'unresolved_ids', COALESCE((SELECT jsonb_agg(data->>'id') FROM src WHERE NOT ok), '[]'::jsonb)
+    )
+  $q$,
+    v_required,
+    CASE WHEN cardinality(v_labels) = 0 THEN 'NULL::text'
+         ELSE array_to_string(v_labels, ' || ''/'' || ') END,
+    v_resolved, v_joins, p_table, v_target, v_values, p_table)
+  INTO v_result
+  USING p_tenant_id, p_rows;
+  RETURN v_result;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION import_code_keyed(UUID, TEXT, JSONB, JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION import_code_keyed(UUID, TEXT, JSONB, JSONB) TO service_role;
+
+-- ---------------------------------------------------------------------------
+-- 2. The per-sheet functions, now only naming their codes
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION import_sites(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  SELECT import_code_keyed(p_tenant_id, 'sites', '[
+    {"column": "client_id", "code": "client_code", "table": "clients", "key": "client_code", "required": true},
+    {"column": "supervisor_id", "code": "supervisor_code", "table": "staff", "key": "staff_code"}
+  ]', p_rows);
+$$;
+
+CREATE OR REPLACE FUNCTION import_site_jobs(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  SELECT import_code_keyed(p_tenant_id, 'site_jobs', '[
+    {"column": "site_id", "code": "site_code", "table": "sites", "key": "site_code", "required": true},
+    {"column": "service_id", "code": "service_code", "table": "services", "key": "service_code"},
+    {"column": "subcontractor_id", "code": "subcontractor_code", "table": "subcontractors", "key": "subcontractor_code"}
+  ]', p_rows);
+$$;
+
+CREATE OR REPLACE FUNCTION import_job_tasks(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  SELECT import_code_keyed(p_tenant_id, 'job_tasks', '[
+    {"column": "job_id", "code": "job_code", "table": "site_jobs", "key": "job_code", "required": true},
+    {"column": "task_id", "code": "task_code", "table": "tasks", "key": "task_code", "required": true}
+  ]', p_rows);
+$$;
+
+CREATE OR REPLACE FUNCTION import_service_tasks(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  SELECT import_code_keyed(p_tenant_id, 'service_tasks', '[
+    {"column": "service_id", "code": "service_code", "table": "services", "key": "service_code", "required": true},
+    {"column": "task_id", "code": "task_code", "table": "tasks", "key": "task_code", "required": true}
+  ]', p_rows);
+$$;
+
+CREATE OR REPLACE FUNCTION import_site_supplies(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  SELECT import_code_keyed(p_tenant_id, 'site_supplies', '[
+    {"column": "site_id", "code": "site_code", "table": "sites", "key": "site_code", "required": true},
+    {"column": "supply_id", "code": "supply_code", "table": "supply_catalog", "key": "code"}
+  ]', p_rows);
+$$;
+
+CREATE OR REPLACE FUNCTION import_inventory_counts(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  SELECT import_code_keyed(p_tenant_id, 'inventory_counts', '[
+    {"column": "site_id", "code": "site_code", "table": "sites", "key": "site_code", "required": true}
+  ]', p_rows);
+$$;
+
+CREATE OR REPLACE FUNCTION import_inventory_count_details(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  SELECT import_code_keyed(p_tenant_id, 'inventory_count_details', '[
+    {"column": "count_id", "code": "count_code", "table": "inventory_counts", "key": "count_code", "required": true},
+    {"column": "supply_id", "code": "supply_code", "table": "supply_catalog", "key": "code", "required": true}
+  ]', p_rows);
+$$;
+
+CREATE OR REPLACE FUNCTION import_equipment_assignments(p_tenant_id UUID, p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+SET search_path = public
+AS $$
+  SELECT import_code_keyed(p_tenant_id, 'equipment_assignments', '[
+    {"column": "equipment_id", "code": "equipment_code", "table": "equipment", "key": "equipment_code", "required": true},
+    {"column": "staff_id", "code": "staff_code", "table": "staff", "key": "staff_code"},
+    {"column": "site_id", "code": "site_code", "table": "sites", "key": "site_code"}
+  ]', p_rows);
+$$;